@@ -4,6 +4,8 @@ import pyhard2.driver as drv
 
 def traverse_iface(parent_node, parent, graph):
     for child_name, child in parent.__dict__.iteritems():
+        if child is parent.parent():
+            continue
         child_node = pydot.Node(name=id(child), label=child_name)
         if isinstance(child, drv.Protocol):
             parent_node.set_fontcolor("red")
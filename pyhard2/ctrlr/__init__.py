@@ -34,6 +34,8 @@ import PyQt4.Qwt5 as Qwt
 import pyhard2
 from pyhard2 import pid
 import pyhard2.driver as drv
+from pyhard2.driver import tcp
+from pyhard2.driver.server import connectToServer
 import pyhard2.rsc
 
 
@@ -48,6 +50,8 @@ def Config(section, title="Controller",
         - ``-n``, ``--nodes``: A space-separated list of nodes at `port`.
         - ``-m``, ``--names``: A corresponding list of names for the `nodes`.
         - ``-v``, ``--virtual``: Load the virtual offline driver.
+        - ``-s``, ``--server``: Connect to the instrument server at
+          `host:port` that owns `port`, see :mod:`pyhard2.driver.server`.
         - `file`: The path to a configuration file.
 
     Launching a controller from the command line with::
@@ -87,6 +91,7 @@ def Config(section, title="Controller",
     parser.add_argument('-n', '--nodes', nargs="*", default=[])
     parser.add_argument('-m', '--names', nargs="*", default=[])
     parser.add_argument('-v', '--virtual', action="store_true")
+    parser.add_argument('-s', '--server')
     parser.add_argument('file', type=argparse.FileType("r"), nargs="?")
     parser.add_argument('config', nargs="*")
     config = parser.parse_args()
@@ -103,6 +108,20 @@ def Config(section, title="Controller",
     return config
 
 
+def openSocket(config):
+    """Return the socket to the hardware at `config.port`.
+
+    If `config.server` is set, return the socket to the instrument
+    server instead; the `Controller` then forwards the requests of the
+    driver to the server.  The driver must not send requests before the
+    `Controller` is created.
+
+    """
+    if config.server:
+        return tcp.connect(config.server)
+    return drv.Serial(config.port)
+
+
 class DashboardConfig(object):
 
     """Extend the config file format described in :func:`Config` to
@@ -954,6 +973,7 @@ class VerticalHeaderItem(QtGui.QStandardItem):
     """Item to use in vertical header of the driver model."""
 
     NodeRole = Qt.UserRole + 1
+    CircuitStateRole = Qt.UserRole + 4
 
     def __init__(self, text=""):
         super(VerticalHeaderItem, self).__init__(text)
@@ -974,6 +994,20 @@ class VerticalHeaderItem(QtGui.QStandardItem):
         """Set the node for this row to `node`."""
         self.setData(node, role=VerticalHeaderItem.NodeRole)
 
+    def circuitState(self):
+        """Return the state of the circuit breakers for this row."""
+        state = self.data(role=VerticalHeaderItem.CircuitStateRole)
+        return state if state else drv.CircuitBreaker.CLOSED
+
+    def setCircuitState(self, state, toolTip=""):
+        """Show the state of the circuit breakers for this row."""
+        if state == self.circuitState():
+            return
+        self.setData(state, role=VerticalHeaderItem.CircuitStateRole)
+        self.setForeground(QtGui.QBrush(
+            Qt.black if state == drv.CircuitBreaker.CLOSED else Qt.red))
+        self.setToolTip(toolTip)
+
 
 class SignalProxy(QtCore.QObject):  # Obsolete in Qt5
     """Proxy class for Qt4 signals.
@@ -991,6 +1025,24 @@ class SignalProxy(QtCore.QObject):  # Obsolete in Qt5
         self.emit = self.signal.emit
 
 
+class CommandSignalProxy(QtCore.QObject):
+    """Forward the `Command.signal` to a Qt signal.
+
+    The driver does not depend on Qt and its signals call their slots
+    in the thread of the driver.  The proxy lives in the GUI thread and
+    re-emits the values as a Qt signal that may be connected with
+    `Qt.QueuedConnection`.
+
+    """
+    signal = Signal(object, object)
+
+    def __init__(self, command, parent=None):
+        super(CommandSignalProxy, self).__init__(parent)
+        self.connect = self.signal.connect
+        self.disconnect = self.signal.disconnect
+        command.signal.connect(self.signal.emit)
+
+
 PollingRole = Qt.UserRole + 2
 LoggingRole = Qt.UserRole + 3
 
@@ -1002,6 +1054,7 @@ class DriverItem(QtGui.QStandardItem):
     def __init__(self):
         super(DriverItem, self).__init__()
         self._signal = SignalProxy()  # Used to write to the driver.
+        self._commandSignal = None  # Used to read from the driver.
 
     def type(self):
         """Return QtGui.QStandardItem.UserType."""
@@ -1081,10 +1134,14 @@ class DriverItem(QtGui.QStandardItem):
         try:
             self.command().read(self.node())
         except drv.HardwareError as e:
-            logging.getLogger(__name__).error(
-                "%s:%s:%s" % (self.command().reader,
-                              self.node(),
-                              e))
+            self._logHardwareError(e)
+
+    def _logHardwareError(self, error):
+        """Log `error` raised by the driver for this item."""
+        logging.getLogger(__name__).error(
+            "%s:%s:%s" % (self.command().reader,
+                          self.node(),
+                          error))
 
     def _connectDriver(self):
         """Connect the `Command` to this item using Qt4 signals and slots.
@@ -1102,7 +1159,8 @@ class DriverItem(QtGui.QStandardItem):
 
         self.setEditable(not self.isReadOnly())
         # getter
-        self.command().signal.connect(displayData, type=Qt.QueuedConnection)
+        self._commandSignal = CommandSignalProxy(self.command())
+        self._commandSignal.connect(displayData, type=Qt.QueuedConnection)
         # setter
         self._signal.connect(writeData, type=Qt.QueuedConnection)
 
@@ -1125,7 +1183,8 @@ class DriverModel(QtGui.QStandardItemModel):
         super(DriverModel, self).__init__(parent)
         self._thread = QtCore.QThread(self)
         self._driver = driver
-        self._driver.moveToThread(self._thread)
+        if isinstance(self._driver, QtCore.QObject):
+            self._driver.moveToThread(self._thread)
         self._thread.start()
         self.setItemPrototype(DriverItem())
 
@@ -1296,6 +1355,8 @@ class Controller(QtCore.QObject):
         self._dataPlotCurves = {}
         self._dataLog = defaultdict(TimeSeriesData)
 
+        if getattr(config, "server", None) and not config.virtual:
+            connectToServer(driver, tcp.connect(config.server), config.port)
         self._driverModel = DriverModel(driver, self)
         self.populated.connect(self._setupWithConfig)
         self.ui.driverView.setModel(self._driverModel)
@@ -1627,9 +1688,39 @@ class Controller(QtCore.QObject):
 
     @Slot()
     def refreshData(self, force=False):
-        for item in self._driverModel:
-            if item.isPolling() or force:
-                item.queryData()
+        """Read the polled items in as few transactions as possible.
+
+        The nodes that stop answering are skipped by their
+        :func:`~pyhard2.driver.circuitBreaker` so that the other nodes
+        on the port keep their polling rate, unless `force` is True.
+
+        See also:
+            :func:`pyhard2.driver.readMany`
+
+        """
+        items = [item for item in self._driverModel
+                 if item.isPolling() or force]
+        values = drv.readMany([(item.command(), item.node())
+                               for item in items], breaker=not force)
+        order = [drv.CircuitBreaker.CLOSED, drv.CircuitBreaker.HALF_OPEN,
+                 drv.CircuitBreaker.OPEN]
+        states = {}
+        for item, value in zip(items, values):
+            if isinstance(value, drv.CircuitOpenError):
+                pass  # the failures opening the breaker were logged
+            elif isinstance(value, drv.HardwareError):
+                item._logHardwareError(value)
+            breaker = drv.circuitBreaker(item.command(), item.node())
+            state = states.get(item.row(), (order[0], ""))
+            if order.index(breaker.state()) > order.index(state[0]):
+                states[item.row()] = (
+                    breaker.state(),
+                    "Node not answering, retry in %.0f s." % breaker.retryIn())
+            else:
+                states.setdefault(item.row(), state)
+        for row, (state, toolTip) in states.iteritems():
+            self._driverModel.verticalHeaderItem(row).setCircuitState(
+                state, toolTip)
 
     @Slot()
     def logData(self):
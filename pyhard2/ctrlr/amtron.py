@@ -89,6 +89,10 @@ class AmtronDaq(drv.Subsystem):
     """Instrument using the DAQ for input (temperature) and the CS400
     for output (laser power).  Output is controller by a software PID.
 
+    The constructor does not talk to the hardware so that the driver
+    may be connected to an instrument server first; call `initialize()`
+    before use.
+
     """
     # connections:
     #    thermometer      pid           laser
@@ -99,14 +103,17 @@ class AmtronDaq(drv.Subsystem):
         self.temperature = daq.Daq(daqline)
         self.temperature.voltage.ai._rfunc = partial(mul, 100)
         self.laser = amtron.CS400(serial)
-        self.laser.control.control_mode.write(amtron.ControlMode.POWER)
-        self.laser.command.laser_state.write(False)
         # Connections
         self.temperature.voltage.ai.signal.connect(self.pid.measure.write)
         self.temperature.voltage.ai.signal.connect(
             lambda value, node: self.pid.output.read(node))
         self.pid.output.signal.connect(self.laser.control.total_power.write)
 
+    def initialize(self):
+        """Control the laser in power mode and switch it off."""
+        self.laser.control.control_mode.write(amtron.ControlMode.POWER)
+        self.laser.command.laser_state.write(False)
+
 
 class _VirtualCommand(object):
 
@@ -146,8 +153,9 @@ def createController():
         driver = VirtualAmtronInstrument()
         iface = AmtronController.virtualInstrumentController(config, driver)
     else:
-        driver = AmtronDaq(drv.Serial(config.port), "Circat1")
-        iface = AmtronController(config, driver)
+        driver = AmtronDaq(ctrlr.openSocket(config), "Circat1")
+        iface = AmtronController(config, driver)  # connects to the server
+        driver.initialize()
         iface.addCommand(driver.temperature.voltage.ai, "temperature / C", poll=True, log=True)
         iface.addCommand(driver.pid.setpoint, "setpoint / C",
                          log=True, specialColumn="programmable")
@@ -25,7 +25,7 @@ def createController():
         driver = virtual.VirtualInstrument()
         iface = ctrlr.Controller.virtualInstrumentController(config, driver)
     else:
-        driver = MFC(drv.Serial(config.port))
+        driver = MFC(ctrlr.openSocket(config))
         iface = ctrlr.Controller(config, driver)
         iface.addCommand(driver.direct_reading.measure, "measure",
                          poll=True, log=True)
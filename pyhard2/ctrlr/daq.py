@@ -79,6 +79,8 @@ def createController():
         driver = VirtualDaq(config.port)
     else:
         driver = daq.Daq(config.port)
+        # Release the DAQmx tasks when the application exits.
+        QtCore.QCoreApplication.instance().aboutToQuit.connect(driver.close)
     iface = ctrlr.Controller(config, driver)
     iface.addCommand(driver.digitalIO.state, "state")
     iface.editorPrototype.default_factory=ValveButton
@@ -18,8 +18,9 @@ def createController():
         driver = virtual.VirtualInstrument()
         iface = ctrlr.virtualInstrumentController(config, driver)
     else:
-        driver = delta.Sm700Series(drv.Serial(config.port))
-        iface = ctrlr.Controller(config, driver)
+        driver = delta.Sm700Series(ctrlr.openSocket(config), readLimits=False)
+        iface = ctrlr.Controller(config, driver)  # connects to the server
+        driver.readLimits()
         iface.addCommand(driver.source.voltage, "Voltage", poll=True, log=True)
         iface.addCommand(driver.source.current, "Current", poll=True, log=True)
     iface.populate()
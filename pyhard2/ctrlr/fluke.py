@@ -24,7 +24,7 @@ def createController():
         iface = ctrlr.Controller.virtualInstrumentController(config, driver)
         iface.programPool.default_factory = ctrlr.SetpointRampProgram
     else:
-        driver = fluke.Fluke18x(drv.Serial(config.port))
+        driver = fluke.Fluke18x(ctrlr.openSocket(config))
         iface = ctrlr.Controller(config, driver)
         iface.addCommand(driver.measure, "Measure", poll=True, log=True)
         iface.addCommand(driver.unit, "Unit", poll=True)
@@ -19,8 +19,6 @@ import pyhard2.driver.virtual as virtual
 def createController():
     """Initialize controller."""
     config = ctrlr.Config("pfeiffer", "Multigauge")
-    if not config.nodes:
-        config.nodes = range(6)
     if not config.nodes:
         config.nodes = range(1, 7)
         config.names = ["G%i" % node for node in config.nodes]
@@ -29,7 +27,7 @@ def createController():
         iface = ctrlr.Controller.virtualInstrumentController(config, driver)
         iface.programPool.default_factory = ctrlr.SetpointRampProgram
     else:
-        driver = Maxigauge(drv.Serial(config.port))
+        driver = Maxigauge(ctrlr.openSocket(config))
         iface = ctrlr.Controller(config, driver)
         iface.editorPrototype.default_factory = ctrlr.ScientificSpinBox
         iface.addCommand(driver.gauge.pressure, u"pressure", poll=True, log=True)
@@ -197,7 +197,7 @@ def createController():
         driver.setup.global_.ramp_rate = Cmd("ramp_rate")
         iface = WatlowController.virtualInstrumentController(config, driver)
     else:
-        driver = Series988(drv.Serial(config.port))
+        driver = Series988(ctrlr.openSocket(config))
         iface = WatlowController(config, driver)
         iface.addCommand(driver.temperature1, "TC sample", poll=True, log=True)
         iface.addCommand(driver.temperature2, "TC heater", poll=True, log=True)
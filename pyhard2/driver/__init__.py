@@ -17,6 +17,11 @@ A `Protocol` may be set on a `Subsystem`.  The `Protocol` will handle
 the command, like, for example, formatting and sending a request to the
 hardware; parse the results; and send it back.
 
+The module does not depend on Qt so that headless processes, such as
+data loggers, start fast.  The `Command.signal` is a lightweight
+`Signal` calling its slots directly; :mod:`pyhard2.ctrlr` bridges it to
+Qt.
+
 A simplified UML representation of a driver using the classes in this
 module is
 
@@ -36,10 +41,14 @@ module is
    class Subsystem {
      read(Context): object
      write(Context): void
+     readMany([(Command, node)]): [object]
+     writeMany([(Command, value, node)]): [HardwareError]
    }
    class Protocol {
      read(Context): object
      write(Context): void
+     readMany([Context]): [object]
+     writeMany([Context]): [HardwareError]
    }
    class CommandCallerProtocol {
      read(Context): object
@@ -68,9 +77,16 @@ module is
 import logging
 logging.basicConfig()
 import time
+import threading as _threading
+import weakref as _weakref
 from copy import deepcopy as _deepcopy
 from functools import partial as _partial
 from collections import defaultdict as _defaultdict
+from collections import OrderedDict as _OrderedDict
+from collections import deque as _deque
+from collections import namedtuple as _namedtuple
+from contextlib import contextmanager as _contextmanager
+from importlib import import_module as _import_module
 
 try:
     from curses import ascii
@@ -78,14 +94,10 @@ except ImportError:
     # Curses does not exist on windows, import local copy.
     import ascii
 
-import sip as _sip
-for _type in "QDate QDateTime QString QTextStream QTime QUrl QVariant".split():
-    _sip.setapi(_type, 2)
-from PyQt4 import QtCore
-Signal, Slot = QtCore.pyqtSignal, QtCore.pyqtSlot
-
 import serial
 
+_logger = logging.getLogger(__name__)
+
 
 class HardwareError(Exception):
     """Exception upon error returned from the hardware.
@@ -97,11 +109,119 @@ class DriverError(IOError):
     """Exception occuring after an error in the software."""
 
 
+def _optionalImport(*names):
+    """Return the first module of `names` that can be imported, or None.
+
+    The optional dependencies of the asynchronous requests are imported
+    on first use so that they do not slow down importing the driver.
+
+    """
+    for name in names:
+        try:
+            return _import_module(name)
+        except ImportError:
+            pass
+    return None
+
+
+def _futures():
+    # Standard library on python 3, `futures` backport on python 2.
+    return _optionalImport("concurrent.futures")
+
+
+def _asyncio():
+    return _optionalImport("asyncio", "trollius")
+
+
 def _identity(*args):
     """A simple identity function."""
     return args[0] if len(args) is 1 else args
 
 
+class BoundSignal(object):
+
+    """The `Signal` of an instance.
+
+    The slots are called in the thread emitting the signal, in the order
+    in which they were connected.
+
+    """
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, slot):
+        """Connect `slot` to the signal."""
+        self._slots.append(slot)
+
+    def disconnect(self, slot=None):
+        """Disconnect `slot` or every slot if `slot` is None."""
+        if slot is None:
+            del self._slots[:]
+        else:
+            self._slots.remove(slot)
+
+    def emit(self, *args):
+        """Call every slot with `args`."""
+        for slot in tuple(self._slots):
+            slot(*args)
+
+
+class Signal(object):
+
+    """Lightweight replacement for Qt signals, without Qt.
+
+    Declare the signal as a class attribute; every instance gets its own
+    `BoundSignal` on first access.  `pyhard2.ctrlr` bridges the signals
+    to Qt.
+
+    Example:
+
+        >>> class Emitter(object):
+        ...     signal = Signal(object)
+        ...
+        >>> emitter = Emitter()
+        >>> received = []
+        >>> emitter.signal.connect(received.append)
+        >>> emitter.signal.emit(42)
+        >>> received
+        [42]
+
+    """
+    def __init__(self, *types):
+        self._types = types
+        self._name = None
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if self._name is None:
+            self._name = next(name for cls in owner.__mro__
+                              for name, attr in vars(cls).iteritems()
+                              if attr is self)
+        # Shadow the descriptor with the bound signal.
+        bound = instance.__dict__[self._name] = BoundSignal()
+        return bound
+
+
+class _Object(object):
+
+    """Base class for the objects of a driver tree.
+
+    Every object has an optional parent.
+
+    """
+    def __init__(self, parent=None):
+        self.__parent = parent
+
+    def parent(self):
+        """Return the parent object."""
+        return self.__parent
+
+    def setParent(self, parent):
+        """Set the parent to `parent`."""
+        self.__parent = parent
+
+
 class Context(object):
 
     """Request to pass to a `Protocol`.
@@ -139,6 +259,554 @@ class Context(object):
         return self.path[0]
 
 
+class _Route(object):
+
+    """The `Protocol` and the path of `Subsystems` for a `Command`.
+
+    The route is resolved once and cached by the `Command`.  Every call
+    to `setParent()` or `setProtocol()` in the tree increments the
+    `generation` so that stale routes are resolved again.
+
+    Attributes:
+        protocol (Protocol): The `Protocol` handling the requests.
+        path ([Subsystem]): The `Subsystems` traversed until the
+            `protocol`.
+        generation (int): The generation of the route.
+
+    Example:
+
+        >>> class Handled(object):
+        ...     value = 0
+        ...
+        >>> driver = Subsystem()
+        >>> driver.measure = Command("value")
+        >>> driver.setProtocol(ObjectWrapperProtocol(Handled()))
+        >>> driver.measure.read()
+        0
+        >>> other = ObjectWrapperProtocol(Handled())
+        >>> other.node().value = 10
+        >>> driver.setProtocol(other)  # the route is resolved again
+        >>> driver.measure.read()
+        10
+
+    """
+    generation = 0
+
+    def __init__(self, command):
+        self.generation = _Route.generation
+        self.path = []
+        subsystem = command.parent()
+        while subsystem is not None:
+            self.path.append(subsystem)
+            protocol = getattr(subsystem, "protocol", lambda: None)()
+            if protocol:
+                self.protocol = protocol
+                return
+            subsystem = subsystem.parent()
+        raise DriverError(" ".join(
+            ("%s does not know what to do with %r," % (
+                self.path[-1].__class__.__name__ if self.path
+                else command.__class__.__name__, command),
+             "it has neither parent nor protocol.")))
+
+    @classmethod
+    def invalidate(cls):
+        """Mark every cached route as stale."""
+        cls.generation += 1
+
+    def isValid(self):
+        """Return True if the tree did not change since the route was
+        resolved; otherwise return False."""
+        return self.generation == _Route.generation
+
+
+class TransactionLock(object):
+
+    """Reentrant lock granting a socket to competing threads in
+    first-in, first-out order.
+
+    Every request/response exchange on a socket should hold the lock so
+    that the exchanges of several threads sharing the socket are not
+    interleaved.
+
+    Example:
+
+        >>> lock = TransactionLock()
+        >>> with lock:
+        ...     with lock:  # reentrant
+        ...         lock.isOwned()
+        True
+        >>> lock.isOwned()
+        False
+
+    """
+    def __init__(self):
+        self._condition = _threading.Condition(_threading.Lock())
+        self._waiting = _deque()
+        self._owner = None
+        self._count = 0
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.release()
+
+    def isOwned(self):
+        """Return True if the current thread holds the lock."""
+        return self._owner is _threading.current_thread()
+
+    def acquire(self):
+        """Wait for the threads queued before the current thread and
+        acquire the lock."""
+        thread = _threading.current_thread()
+        with self._condition:
+            if self._owner is thread:
+                self._count += 1
+                return
+            self._waiting.append(thread)
+            while self._owner is not None or self._waiting[0] is not thread:
+                self._condition.wait()
+            self._waiting.popleft()
+            self._owner, self._count = thread, 1
+
+    def release(self):
+        """Release the lock and wake the next thread in the queue."""
+        with self._condition:
+            if self._owner is not _threading.current_thread():
+                raise RuntimeError("cannot release un-acquired lock")
+            self._count -= 1
+            if not self._count:
+                self._owner = None
+                self._condition.notify_all()
+
+
+class _NoTransaction(object):
+
+    """Context manager doing nothing, for protocols without socket."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+
+_transactionLocks = _weakref.WeakKeyDictionary()
+_transactionLocksLock = _threading.Lock()
+
+
+def transaction(socket):
+    """Return the `TransactionLock` shared by every user of `socket`.
+
+    Example:
+        Scripts talking to the socket directly should hold the lock::
+
+            with transaction(socket):
+                socket.write(request)
+                answer = socket.readline()
+
+    """
+    with _transactionLocksLock:
+        try:
+            return _transactionLocks[socket]
+        except KeyError:
+            lock = _transactionLocks[socket] = TransactionLock()
+            return lock
+
+
+_requestQueues = _weakref.WeakKeyDictionary()
+_requestQueuesLock = _threading.Lock()
+
+
+def _requestQueue(protocol):
+    """Return the request queue for the socket of `protocol`.
+
+    Requests to the same socket are executed in order in a single worker
+    thread; requests to different sockets run concurrently.  Protocols
+    without a socket get a queue of their own.
+
+    """
+    key = getattr(protocol, "_socket", protocol)
+    with _requestQueuesLock:
+        try:
+            return _requestQueues[key]
+        except KeyError:
+            queue = _requestQueues[key] = _futures().ThreadPoolExecutor(1)
+            return queue
+
+
+class Stats(object):
+
+    """Counters and round-trip times of the requests.
+
+    `Stats` are kept for every `Command` and node, and for every
+    `Protocol`.  Protocols communicating via a socket share the `Stats`
+    of the socket, where `Serial` and `TesterSocket` also count the
+    bytes exchanged and the timeouts.
+
+    Parameters:
+        size (int, optional): Number of round-trip times kept to
+            compute the percentiles.
+
+    The percentiles are computed on the successful requests only so
+    that the timeouts do not skew them.  A request fails if it raises
+    an exception or if a read from the socket times out.
+
+    Attributes:
+        requests (int): Number of requests.
+        errors (int): Number of failed requests.
+        consecutiveErrors (int): Number of errors since the last
+            successful request.
+        timeouts (int): Number of reads that timed out.
+        bytesRead (int), bytesWritten (int): Bytes exchanged.
+        latencySum (float): Total round-trip time in seconds of the
+            successful requests.
+
+    Example:
+
+        >>> stats = Stats()
+        >>> for latency in (0.1, 0.2, 0.3, 0.4):
+        ...     stats.record(latency)
+        >>> stats.record(5.0, error=True)
+        >>> stats.requests, stats.errors, stats.consecutiveErrors
+        (5, 1, 1)
+        >>> stats.percentile(50), stats.percentile(100)
+        (0.2, 0.4)
+
+    """
+    def __init__(self, size=1024):
+        self.requests = self.errors = self.timeouts = 0
+        self.consecutiveErrors = 0
+        self.bytesRead = self.bytesWritten = 0
+        self.latencySum = 0.0
+        self._latencies = _deque(maxlen=size)
+        self._lock = _threading.Lock()
+
+    def __repr__(self):
+        return ("%s(requests=%i, errors=%i, timeouts=%i, "
+                "bytesRead=%i, bytesWritten=%i)" % (
+                    self.__class__.__name__, self.requests, self.errors,
+                    self.timeouts, self.bytesRead, self.bytesWritten))
+
+    def record(self, latency, error=False, timeouts=0):
+        """Record a request that took `latency` seconds and during which
+        `timeouts` reads timed out."""
+        with self._lock:
+            self.requests += 1
+            self.timeouts += timeouts
+            if error:
+                self.errors += 1
+                self.consecutiveErrors += 1
+            else:
+                self.consecutiveErrors = 0
+                self.latencySum += latency
+                self._latencies.append(latency)
+
+    def recordRead(self, n, timeout=False):
+        """Record reading `n` bytes."""
+        with self._lock:
+            self.bytesRead += n
+            self.timeouts += bool(timeout)
+
+    def recordWrite(self, n):
+        """Record writing `n` bytes."""
+        with self._lock:
+            self.bytesWritten += n
+
+    def samples(self):
+        """Return the number of round-trip times kept."""
+        return len(self._latencies)
+
+    def percentile(self, q):
+        """Return the `q`-th percentile of the recent round-trip times,
+        or None if no successful request was recorded."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        rank = max(0, int(round(q / 100.0 * len(latencies))) - 1)
+        return latencies[min(rank, len(latencies) - 1)]
+
+
+_socketStats = _weakref.WeakKeyDictionary()
+_socketStatsLock = _threading.Lock()
+
+
+def socketStats(socket):
+    """Return the `Stats` shared by every user of `socket`."""
+    with _socketStatsLock:
+        try:
+            return _socketStats[socket]
+        except KeyError:
+            stats = _socketStats[socket] = Stats()
+            return stats
+
+
+class _Measure(object):
+
+    """Measure the round trip of the requests recorded in `stats` on
+    `protocol`.
+
+    A request fails if it raises an exception, if it gets a
+    `HardwareError`, or if a read from the socket times out.  The caller
+    holds the `transaction()` lock so that the timeouts of the socket
+    are those of the requests.
+
+    Attributes:
+        latency (float): The round-trip time in seconds.
+        timeouts (int): The number of reads that timed out.
+
+    """
+    def __init__(self, protocol, stats):
+        self._socketStats = protocol.stats()
+        self._stats = stats
+        self.latency, self.timeouts = 0.0, 0
+
+    def __enter__(self):
+        self._timeouts = self._socketStats.timeouts
+        self._start = time.time()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.latency = time.time() - self._start
+        self.timeouts = self._socketStats.timeouts - self._timeouts
+        if type is not None:
+            self.record([True] * len(self._stats))
+
+    def record(self, errors):
+        """Record the outcome of the requests; `errors` tells for every
+        `Stats` whether its request failed."""
+        timedOut = bool(self.timeouts)
+        for stats, error in zip(self._stats, errors):
+            stats.record(self.latency, error=error or timedOut,
+                         timeouts=self.timeouts)
+        # The socket already counted its timeouts.
+        self._socketStats.record(self.latency,
+                                 error=timedOut or any(errors))
+
+
+class AdaptiveTimeout(object):
+
+    """Derive the timeout of every `Command` from its round-trip times.
+
+    The timeout is the `percentile` of the recent round-trip times of the
+    `Command` on the node times `margin`, bound by `floor` and
+    `ceiling`.  The default timeout of the socket is used until
+    `samples` requests succeeded and after a request failed, so that a
+    slower instrument does not fail forever.
+
+    Parameters:
+        margin (float): Factor applied to the percentile.
+        floor (float): Minimum timeout in seconds.
+        ceiling (float, optional): Maximum timeout in seconds, default
+            to the timeout of the socket.
+        percentile (float): Percentile of the round-trip times.
+        samples (int): Number of requests needed to learn the timeout.
+
+    Example:
+
+        >>> policy = AdaptiveTimeout(margin=2.0, floor=0.05, samples=3)
+        >>> stats = Stats()
+        >>> policy.timeout(stats, 5.0)
+        5.0
+        >>> for latency in (0.010, 0.020, 0.040):
+        ...     stats.record(latency)
+        >>> policy.timeout(stats, 5.0)
+        0.08
+        >>> stats.record(0.08, error=True)
+        >>> policy.timeout(stats, 5.0)
+        5.0
+
+    """
+    def __init__(self, margin=3.0, floor=0.05, ceiling=None,
+                 percentile=99, samples=10):
+        self.margin = margin
+        self.floor = floor
+        self.ceiling = ceiling
+        self.percentile = percentile
+        self.samples = samples
+
+    def __repr__(self):
+        return ("%s(margin=%r, floor=%r, ceiling=%r, percentile=%r, "
+                "samples=%r)" % (self.__class__.__name__, self.margin,
+                                 self.floor, self.ceiling, self.percentile,
+                                 self.samples))
+
+    def timeout(self, stats, default):
+        """Return the timeout for the next request recorded in `stats`.
+
+        The timeout of a batch of requests is the longest timeout of
+        the requests.
+
+        Parameters:
+            stats (Stats): The `Stats` of the `Command` on the node.
+            default (float): The default timeout of the socket.
+
+        """
+        ceiling = self.ceiling if self.ceiling is not None else default
+        if stats.consecutiveErrors or stats.samples() < self.samples:
+            return ceiling
+        timeout = max(self.floor,
+                      self.margin * stats.percentile(self.percentile))
+        return timeout if ceiling is None else min(ceiling, timeout)
+
+
+@_contextmanager
+def _socketTimeout(socket, timeout):
+    """Set the timeout of `socket` to `timeout` in the block."""
+    default = getattr(socket, "timeout", None)
+    if timeout == default:
+        yield
+        return
+    socket.timeout = timeout
+    try:
+        yield
+    finally:
+        socket.timeout = default
+
+
+class CircuitOpenError(HardwareError):
+    """The `CircuitBreaker` of the node is open."""
+
+
+class CircuitBreaker(object):
+
+    """Stop sending requests to a node that does not answer.
+
+    The breaker opens after `threshold` consecutive failures.  While it
+    is open, the requests are not sent.  Once the backoff delay has
+    elapsed, the breaker is half open and lets one probe request
+    through.  A successful probe closes it.  A failed probe opens it
+    again and doubles the delay, up to `maxBackoff`.
+
+    Parameters:
+        threshold (int): Number of consecutive failures that open the
+            breaker.
+        backoff (float): Initial delay in seconds before probing.
+        maxBackoff (float): Maximum delay in seconds between probes.
+
+    Example:
+
+        >>> breaker = CircuitBreaker(threshold=2, backoff=60.0)
+        >>> breaker.record(False)
+        >>> breaker.state()
+        'closed'
+        >>> breaker.record(False)
+        >>> breaker.state(), breaker.allow()
+        ('open', False)
+        >>> breaker.record(True)
+        >>> breaker.state(), breaker.allow()
+        ('closed', True)
+
+    """
+    CLOSED, HALF_OPEN, OPEN = "closed", "half-open", "open"
+
+    def __init__(self, threshold=3, backoff=1.0, maxBackoff=60.0):
+        self.threshold = threshold
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+        self.failures = 0
+        self._delay = backoff
+        self._retryAt = None
+        self._probing = False
+
+    def __repr__(self):
+        return "%s(threshold=%r, backoff=%r, maxBackoff=%r)" % (
+            self.__class__.__name__, self.threshold, self.backoff,
+            self.maxBackoff)
+
+    def state(self):
+        """Return `CLOSED`, `HALF_OPEN`, or `OPEN`."""
+        if self._retryAt is None:
+            return self.CLOSED
+        if self._probing or time.time() >= self._retryAt:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def retryIn(self):
+        """Return the delay in seconds before the next probe."""
+        if self._retryAt is None:
+            return 0.0
+        return max(0.0, self._retryAt - time.time())
+
+    def allow(self):
+        """Return True if a request may be sent; otherwise return False.
+
+        Only one probe request is let through when the breaker is half
+        open.
+
+        """
+        state = self.state()
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def cancel(self):
+        """Let the next probe through if the probe allowed by `allow()`
+        was not sent."""
+        self._probing = False
+
+    def record(self, success):
+        """Record the outcome of a request."""
+        self._probing = False
+        if success:
+            self.failures = 0
+            self._delay = self.backoff
+            self._retryAt = None
+            return
+        self.failures += 1
+        if self._retryAt is not None:
+            # The probe failed.
+            self._delay = min(2 * self._delay, self.maxBackoff)
+        elif self.failures < self.threshold:
+            return
+        self._retryAt = time.time() + self._delay
+
+
+_circuitBreakers = _weakref.WeakKeyDictionary()
+_circuitBreakersLock = _threading.Lock()
+
+
+def circuitBreaker(command, node=None):
+    """Return the `CircuitBreaker` of `node` on the `Protocol` of
+    `command`.
+
+    The breaker is shared by every `Command` handled by the same
+    `Protocol`.
+
+    Example:
+
+        >>> class Disconnected(object):
+        ...     @property
+        ...     def value(self):
+        ...         raise HardwareError("No answer.")
+        ...
+        >>> driver = Subsystem()
+        >>> driver.setProtocol(ObjectWrapperProtocol(Disconnected()))
+        >>> driver.value = Command("value")
+        >>> for __ in range(3):
+        ...     __ = readMany([(driver.value, None)], breaker=True)
+        >>> circuitBreaker(driver.value).state()
+        'open'
+        >>> readMany([(driver.value, None)], breaker=True)
+        [CircuitOpenError('Node None does not answer, retry in 1.0 s.',)]
+
+    """
+    protocol = command._route().protocol
+    with _circuitBreakersLock:
+        breakers = _circuitBreakers.setdefault(protocol, {})
+        try:
+            return breakers[node]
+        except KeyError:
+            breaker = breakers[node] = CircuitBreaker()
+            return breaker
+
+
 class Access(object):
 
     """Enum for read-only, read-write, and write-only access.
@@ -150,7 +818,10 @@ class Access(object):
     RO, WO, RW = [".".join(("Access", a)) for a in "RO WO RW".split()]
 
 
-class Command(QtCore.QObject):
+CacheInfo = _namedtuple("CacheInfo", "hits misses ttl size")
+
+
+class Command(_Object):
 
     """Store information related to a `Command`.
 
@@ -170,11 +841,16 @@ class Command(QtCore.QObject):
             can be used either for type conversion (i.e., str to int) or
             for pretty printing.  Do nothing by default.
         doc: docstring
+        cache_ttl (float, optional): Time in seconds during which a
+            value read is returned again without accessing the
+            hardware.  Writing to a node invalidates its value.  The
+            cache is disabled by default.
 
     Attributes:
         signal (value, node):
             Emit the value returned by `read()` and the node.
         Context (class Context): Nested `Context` class.
+        cache_ttl (float): Time to live of the cached values.
 
     """
     signal = Signal(object, object)
@@ -184,11 +860,16 @@ class Command(QtCore.QObject):
     See :class:`Context`.
 
     """
+    # Created on first use, most `Commands` are never cached.
+    __route = __cache = __stats = None
+    __hits = __misses = 0
+
     def __init__(self, reader, writer=None,
                  minimum=None, maximum=None,
                  access=Access.RW,
                  rfunc=None, wfunc=None,
                  doc=None,
+                 cache_ttl=None,
                  ):
         super(Command, self).__init__()
         self.reader = reader
@@ -198,6 +879,7 @@ class Command(QtCore.QObject):
         self._rfunc = rfunc if rfunc else _identity
         self._wfunc = wfunc if wfunc else _identity
         self.__doc__ = doc
+        self.cache_ttl = cache_ttl
 
     def __repr__(self):
         return " ".join(
@@ -208,7 +890,111 @@ class Command(QtCore.QObject):
                 self.minimum, self.maximum, self.access,
                 self._rfunc, self._wfunc, self.__doc__)
 
-    @Slot()
+    def setParent(self, parent):
+        """Set the parent to `parent` and invalidate the routes."""
+        super(Command, self).setParent(parent)
+        _Route.invalidate()
+
+    def _route(self):
+        """Return the cached `_Route` to the `Protocol`."""
+        route = self.__route
+        if route is None or not route.isValid():
+            route = self.__route = _Route(self)
+        return route
+
+    def _context(self, route, value=None, node=None):
+        """Return a `Context` along `route`."""
+        context = self.Context(self, value, node)
+        context.path.extend(route.path)
+        return context
+
+    def _cachedValue(self, node):
+        """Return the value cached for `node`.
+
+        Raises:
+            KeyError: if the cache is disabled or no valid value is
+                cached.
+
+        """
+        if not self.cache_ttl:
+            raise KeyError(node)
+        entry = self.__cache.get(node) if self.__cache else None
+        if entry is None or time.time() - entry[0] > self.cache_ttl:
+            self.__misses += 1
+            raise KeyError(node)
+        self.__hits += 1
+        return entry[1]
+
+    def _cacheValue(self, node, value):
+        """Cache `value` for `node` if the cache is enabled."""
+        if self.cache_ttl:
+            cache = self.__cache
+            if cache is None:
+                cache = vars(self).setdefault("_Command__cache", {})
+            cache[node] = (time.time(), value)
+
+    def _uncacheValue(self, node):
+        """Drop the value cached for `node`."""
+        if self.__cache:
+            self.__cache.pop(node, None)
+
+    def cacheInfo(self):
+        """Return the cache statistics.
+
+        Returns:
+            CacheInfo: named tuple with `hits`, `misses`, `ttl`, and the
+                number of cached values `size`.
+
+        Example:
+
+            >>> class Handled(object):
+            ...     version = 1.0
+            ...
+            >>> driver = Subsystem()
+            >>> driver.setProtocol(ObjectWrapperProtocol(Handled()))
+            >>> driver.version = Command("version", cache_ttl=60.0)
+            >>> driver.version.read(), driver.version.read()
+            (1.0, 1.0)
+            >>> driver.version.cacheInfo()
+            CacheInfo(hits=1, misses=1, ttl=60.0, size=1)
+
+        """
+        return CacheInfo(self.__hits, self.__misses, self.cache_ttl,
+                         len(self.__cache) if self.__cache else 0)
+
+    def clearCache(self):
+        """Drop the cached values and reset the statistics."""
+        if self.__cache:
+            self.__cache.clear()
+        self.__hits = self.__misses = 0
+
+    def stats(self):
+        """Return a dict mapping the nodes to their `Stats`.
+
+        Example:
+
+            >>> class Handled(object):
+            ...     value = 0
+            ...
+            >>> driver = Subsystem()
+            >>> driver.setProtocol(ObjectWrapperProtocol(Handled()))
+            >>> driver.measure = Command("value")
+            >>> driver.measure.read(), driver.measure.read()
+            (0, 0)
+            >>> driver.measure.stats()[None].requests
+            2
+
+        """
+        return dict(self.__stats) if self.__stats else {}
+
+    def _nodeStats(self, node):
+        """Return the `Stats` of the requests on `node`."""
+        stats = self.__stats
+        if stats is None:
+            stats = vars(self).setdefault("_Command__stats",
+                                          _defaultdict(Stats))
+        return stats[node]
+
     def read(self, node=None):
         """Request reading a value from `node`.
 
@@ -221,11 +1007,33 @@ class Command(QtCore.QObject):
         """
         if self.access is Access.WO:
             raise DriverError("Read access violation in %r" % self)
-        value = self._rfunc(self.parent().read(self.Context(self, node=node)))
+        try:
+            value = self._cachedValue(node)
+        except KeyError:
+            value = self._rfunc(self._readRaw(node))
+            self._cacheValue(node, value)
         self.signal.emit(value, node)
         return value
 
-    @Slot(object, object)
+    def _readRaw(self, node=None):
+        """Return the value read by the `Protocol`, before `rfunc`."""
+        route, stats = self._route(), self._nodeStats(node)
+        with route.protocol.transaction(), route.protocol.timeout(stats):
+            with _Measure(route.protocol, [stats]) as measure:
+                value = route.protocol.read(self._context(route, node=node))
+            measure.record([False])
+            return value
+
+    def _writeRaw(self, value, node=None):
+        """Pass `value`, after `wfunc`, to the `Protocol`."""
+        route, stats = self._route(), self._nodeStats(node)
+        context = self._context(route, value, node=node)
+        self._uncacheValue(node)
+        with route.protocol.transaction(), route.protocol.timeout(stats):
+            with _Measure(route.protocol, [stats]) as measure:
+                route.protocol.write(context)
+            measure.record([False])
+
     def write(self, value=None, node=None):
         """Request writing `value` in `node`.
 
@@ -238,10 +1046,66 @@ class Command(QtCore.QObject):
             raise DriverError("Write access violation in %r" % self)
         if value is None and self.access is not Access.WO:
             raise DriverError("Must write something in %r" % self)
-        self.parent().write(self.Context(self, self._wfunc(value), node=node))
+        self._writeRaw(self._wfunc(value), node)
+
+    def aread(self, node=None, loop=None):
+        """Request reading a value from `node` asynchronously.
+
+        The request is queued on the socket of the `Protocol` and
+        executed in a worker thread so that instruments on different
+        ports may be polled concurrently.
+
+        Parameters:
+            loop (optional): If an `asyncio` event loop is given, return
+                an `asyncio` future bound to `loop` that can be awaited
+                from a coroutine.
+
+        Returns:
+            concurrent.futures.Future: The value.
+
+        Note:
+            Requires the `futures` package on python 2 and `trollius`
+            to use an event loop.
 
+        Example:
 
-class Subsystem(QtCore.QObject):
+            >>> class Handled(object):
+            ...     value = 0
+            ...
+            >>> driver = Subsystem()
+            >>> driver.setProtocol(ObjectWrapperProtocol(Handled()))
+            >>> driver.measure = Command("value")
+            >>> driver.measure.aread().result()
+            0
+
+        """
+        return self.__submit(loop, self.read, node)
+
+    def awrite(self, value=None, node=None, loop=None):
+        """Request writing `value` in `node` asynchronously.
+
+        Returns:
+            concurrent.futures.Future: None when the value is written.
+
+        See also:
+            `aread()`
+
+        """
+        return self.__submit(loop, self.write, value, node)
+
+    def __submit(self, loop, method, *args):
+        if _futures() is None:
+            raise DriverError("Asynchronous requests require `futures`.")
+        future = _requestQueue(self._route().protocol).submit(method, *args)
+        if loop is None:
+            return future
+        asyncio = _asyncio()
+        if asyncio is None:
+            raise DriverError("Event loops require `asyncio` or `trollius`.")
+        return asyncio.wrap_future(future, loop=loop)
+
+
+class Subsystem(_Object):
 
     """A logical group of one or more commands."""
 
@@ -259,13 +1123,19 @@ class Subsystem(QtCore.QObject):
                 value.setParent(self)
         super(Subsystem, self).__setattr__(name, value)
 
+    def setParent(self, parent):
+        """Set the parent to `parent` and invalidate the routes."""
+        super(Subsystem, self).setParent(parent)
+        _Route.invalidate()
+
     def protocol(self):
         """Return the protocol if one has been set."""
         return self._protocol
 
     def setProtocol(self, protocol):
-        """Set the protocol to `protocol`."""
+        """Set the protocol to `protocol` and invalidate the routes."""
         self._protocol = protocol
+        _Route.invalidate()
 
     def read(self, context):
         """Forward the read request.
@@ -315,13 +1185,223 @@ class Subsystem(QtCore.QObject):
             else:
                 raise
 
+    def readMany(self, requests, breaker=False):
+        """Read several `(command, node)` pairs at once.
+
+        See also:
+            :func:`readMany`
+
+        """
+        return readMany(requests, breaker)
+
+    def writeMany(self, requests):
+        """Write several `(command, value, node)` triples at once.
+
+        See also:
+            :func:`writeMany`
+
+        """
+        return writeMany(requests)
 
-class Protocol(QtCore.QObject):
+    def stats(self):
+        """Return the `Stats` of the `Commands` in the tree.
+
+        Returns:
+            OrderedDict: Map `(name, node)` to the `Stats`, where `name`
+                is the dotted path to the `Command` from this
+                `Subsystem`.
+
+        Example:
+
+            >>> class Handled(object):
+            ...     voltage = 1.5
+            ...
+            >>> driver = Subsystem()
+            >>> driver.setProtocol(ObjectWrapperProtocol(Handled()))
+            >>> driver.output = Subsystem(driver)
+            >>> driver.output.voltage = Command("voltage")
+            >>> driver.output.voltage.read()
+            1.5
+            >>> driver.stats().keys()
+            [('output.voltage', None)]
+
+        """
+        stats = _OrderedDict()
+        for name, child in sorted(vars(self).iteritems()):
+            if name.startswith("_"):
+                continue  # parent and protocol
+            if isinstance(child, Command):
+                for node, value in sorted(child.stats().iteritems()):
+                    stats[name, node] = value
+            elif isinstance(child, Subsystem) and child.parent() is self:
+                for (path, node), value in child.stats().iteritems():
+                    stats[".".join((name, path)), node] = value
+        return stats
+
+
+def readMany(requests, breaker=False):
+    """Read several `(command, node)` pairs at once.
+
+    The requests are grouped by `Protocol` and every group is passed to
+    `Protocol.readMany()` so that protocols supporting it send a single
+    transaction on the wire.  The `signal` of every `Command` read
+    successfully is emitted.
+
+    Parameters:
+        breaker (bool): If True, do not send the requests to the nodes
+            whose `circuitBreaker()` is open and record one outcome per
+            node in its breaker: success if any request to the node
+            succeeded.  The skipped requests get a `CircuitOpenError`.
+            The nodes of a batch raising an exception record a failure
+            before the exception propagates.
+
+    Returns:
+        list: The value for every request, in order, or the
+            `HardwareError` raised while reading it.
+
+    Raises:
+        DriverError: if trying to read a write-only command.
+
+    Example:
+
+        >>> class Handled(object):
+        ...     voltage, current = 1.5, 0.5
+        ...
+        >>> driver = Subsystem()
+        >>> driver.setProtocol(ObjectWrapperProtocol(Handled()))
+        >>> driver.voltage = Command("voltage")
+        >>> driver.current = Command("current")
+        >>> driver.readMany([(driver.voltage, 1), (driver.current, 1)])
+        [1.5, 0.5]
+
+    """
+    batches = _OrderedDict()
+    values = [None] * len(requests)
+    # Map the breakers of the nodes to the success of their requests, or
+    # to None if the breaker is open.
+    outcomes = _OrderedDict()
+    sent = set()  # the breakers of the nodes requested
+    try:
+        for index, (command, node) in enumerate(requests):
+            if command.access is Access.WO:
+                raise DriverError("Read access violation in %r" % command)
+            try:
+                values[index] = command._cachedValue(node)
+            except KeyError:
+                if breaker:
+                    nodeBreaker = circuitBreaker(command, node)
+                    if nodeBreaker not in outcomes:
+                        # Every request to the node is part of the probe.
+                        outcomes[nodeBreaker] = (
+                            False if nodeBreaker.allow() else None)
+                    if outcomes[nodeBreaker] is None:
+                        values[index] = CircuitOpenError(
+                            "Node %r does not answer, retry in %.1f s." % (
+                                node, nodeBreaker.retryIn()))
+                        continue
+                route = command._route()
+                batches.setdefault(route.protocol, []).append(
+                    (index, command, command._context(route, node=node)))
+            else:
+                command.signal.emit(values[index], node)
+        for protocol, batch in batches.iteritems():
+            stats = [command._nodeStats(context.node)
+                     for __, command, context in batch]
+            if breaker:
+                sent.update(circuitBreaker(command, context.node)
+                            for __, command, context in batch)
+            with protocol.transaction(), protocol.timeout(*stats):
+                # Every request of the batch waits for the whole round trip.
+                with _Measure(protocol, stats) as measure:
+                    answers = protocol.readMany(
+                        [context for __, __, context in batch])
+            measure.record([isinstance(__, HardwareError) for __ in answers])
+            for (index, command, context), value in zip(batch, answers):
+                if breaker and not isinstance(value, HardwareError):
+                    outcomes[circuitBreaker(command, context.node)] = True
+                if not isinstance(value, HardwareError):
+                    try:
+                        value = command._rfunc(value)
+                    except HardwareError as e:
+                        value = e
+                    else:
+                        command._cacheValue(context.node, value)
+                        command.signal.emit(value, context.node)
+                values[index] = value
+    finally:
+        # Also record the batches that raised so that the nodes raising
+        # a `DriverError` open their breaker too.
+        for nodeBreaker, success in outcomes.iteritems():
+            if nodeBreaker in sent:
+                nodeBreaker.record(success)
+            elif success is not None:
+                nodeBreaker.cancel()
+    return values
+
+
+def writeMany(requests):
+    """Write several `(command, value, node)` triples at once.
+
+    The requests are grouped by `Protocol` and every group is passed to
+    `Protocol.writeMany()` so that protocols supporting it use the
+    fewest transactions on the wire.
+
+    Returns:
+        list: The status of every request, in order: None if the value
+            was written or the `HardwareError` raised while writing it.
+
+    Raises:
+        DriverError: if writing a read-only command or if a value is
+            None for a command that is not write-only.
+
+    Example:
+
+        >>> class Handled(object):
+        ...     voltage = 0
+        ...
+        >>> driver = Subsystem()
+        >>> driver.setProtocol(ObjectWrapperProtocol(Handled()))
+        >>> driver.voltage = Command("voltage")
+        >>> driver.writeMany([(driver.voltage, 1.5, 1),
+        ...                   (driver.voltage, 0.5, 2)])
+        [None, None]
+        >>> driver.readMany([(driver.voltage, 1), (driver.voltage, 2)])
+        [1.5, 0.5]
+
+    """
+    batches = _OrderedDict()
+    for index, (command, value, node) in enumerate(requests):
+        if command.access is Access.RO:
+            raise DriverError("Write access violation in %r" % command)
+        if value is None and command.access is not Access.WO:
+            raise DriverError("Must write something in %r" % command)
+        route = command._route()
+        batches.setdefault(route.protocol, []).append(
+            (index, command, command._context(route, command._wfunc(value),
+                                              node=node)))
+    statuses = [None] * len(requests)
+    for protocol, batch in batches.iteritems():
+        for __, command, context in batch:
+            command._uncacheValue(context.node)
+        stats = [command._nodeStats(context.node)
+                 for __, command, context in batch]
+        with protocol.transaction(), protocol.timeout(*stats):
+            with _Measure(protocol, stats) as measure:
+                answers = protocol.writeMany(
+                    [context for __, __, context in batch])
+        measure.record([isinstance(__, HardwareError) for __ in answers])
+        for (index, command, context), status in zip(batch, answers):
+            statuses[index] = status
+    return statuses
+
+
+class Protocol(_Object):
 
     """Protocols should derive this class."""
 
     def __init__(self, parent=None):
         super(Protocol, self).__init__(parent)
+        self._stats = Stats()
 
     def read(self, context):
         """Handle the read request."""
@@ -331,6 +1411,69 @@ class Protocol(QtCore.QObject):
         """Handle the write request."""
         raise NotImplementedError
 
+    def transaction(self):
+        """Return the lock to hold during a request/response exchange.
+
+        The default implementation does not lock anything.
+
+        """
+        return _NoTransaction()
+
+    def stats(self):
+        """Return the `Stats` of the requests handled by the protocol."""
+        return self._stats
+
+    def timeout(self, *stats):
+        """Return the context in which the requests recorded in `stats`
+        are handled.
+
+        The default implementation does nothing.
+
+        """
+        return _NoTransaction()
+
+    def readMany(self, contexts):
+        """Handle several read requests at once.
+
+        The default implementation calls `read()` for every context.
+        Protocols that can coalesce the requests into a single
+        transaction on the wire should reimplement this method.
+
+        Returns:
+            list: The value read for every context, in order, or the
+                `HardwareError` raised while reading it.
+
+        """
+        values = []
+        for context in contexts:
+            try:
+                values.append(self.read(context))
+            except HardwareError as e:
+                values.append(e)
+        return values
+
+    def writeMany(self, contexts):
+        """Handle several write requests at once.
+
+        The default implementation calls `write()` for every context.
+        Protocols that can group the requests, for example with a
+        broadcast, should reimplement this method.
+
+        Returns:
+            list: None for every context written, or the `HardwareError`
+                raised while writing it.
+
+        """
+        statuses = []
+        for context in contexts:
+            try:
+                self.write(context)
+            except HardwareError as e:
+                statuses.append(e)
+            else:
+                statuses.append(None)
+        return statuses
+
 
 class CommandCallerProtocol(Protocol):
 
@@ -428,29 +1571,104 @@ class CommunicationProtocol(Protocol):
     """Protocols that communicate via a socket should derive this class
     and implement the `read()` and `write()` methods.
 
+    The `Commands` hold the `transaction()` lock of the socket while
+    calling `read()` and `write()` so that each request/response
+    exchange is atomic, even when several threads share the socket.
+
     """
     def __init__(self, socket, parent=None):
         super(CommunicationProtocol, self).__init__(parent)
         self._socket = socket
+        self._adaptiveTimeout = None
+
+    def adaptiveTimeout(self):
+        """Return the `AdaptiveTimeout` policy, if any."""
+        return self._adaptiveTimeout
+
+    def setAdaptiveTimeout(self, policy):
+        """Set the timeout of the socket per `Command` and node with
+        the `AdaptiveTimeout` `policy`, None restores the timeout set
+        by the protocol.
+
+        Example:
+
+            >>> class Timeout(CommunicationProtocol):
+            ...     def read(self, context):
+            ...         return self._socket.timeout
+            ...
+            >>> socket = TesterSocket()
+            >>> socket.timeout = 5.0
+            >>> driver = Subsystem()
+            >>> driver.setProtocol(Timeout(socket))
+            >>> driver.protocol().setAdaptiveTimeout(
+            ...     AdaptiveTimeout(floor=0.01, samples=1))
+            >>> driver.timeout = Command("timeout")
+            >>> driver.timeout.read(), driver.timeout.read()
+            (5.0, 0.01)
+            >>> socket.timeout
+            5.0
+
+        """
+        self._adaptiveTimeout = policy
+
+    def timeout(self, *stats):
+        """Set the timeout of the socket for the requests recorded in
+        `stats` if an `AdaptiveTimeout` is set.
+
+        The requests of a batch get the longest of their timeouts.
+
+        """
+        if self._adaptiveTimeout is None:
+            return _NoTransaction()
+        default = getattr(self._socket, "timeout", None)
+        timeouts = [self._adaptiveTimeout.timeout(__, default)
+                    for __ in stats]
+        return _socketTimeout(self._socket, None if None in timeouts
+                              else max(timeouts))
+
+    def transaction(self):
+        """Return the `TransactionLock` of the socket.
+
+        The lock is shared by every protocol using the socket.
+
+        """
+        return transaction(self._socket)
+
+    def stats(self):
+        """Return the `Stats` of the socket.
+
+        The `Stats` are shared by every protocol using the socket.
+
+        """
+        return socketStats(self._socket)
 
 
 def splitlines(txt, sep="\n"):
-    """Return a list of the lines in `txt`, breaking at `sep`."""
-    def _iterator(_txt):
-        if not _txt:
-            raise StopIteration()
-        partition = _txt.partition(sep)
-        yield "".join(partition[0:2])
-        # next line: `yield from` with python 3.4
-        for __ in _iterator(partition[2]):
-            yield __
-    return [__ for __ in _iterator(txt)]
+    r"""Return a list of the lines in `txt`, breaking at `sep`.
+
+    The separators are kept.
+
+    Example:
+
+        >>> splitlines("a\r\nb\r\nc", "\r\n")
+        ['a\r\n', 'b\r\n', 'c']
+
+    """
+    lines = txt.split(sep)
+    last = lines.pop()
+    lines = [line + sep for line in lines]
+    if last:
+        lines.append(last)
+    return lines
 
 
 class TesterSocket(object):
 
     """A fake socket with canned responses, used for testing.
 
+    The buffer is a `deque` of lines so that large scripted sessions
+    are served in linear time.
+
     Attributes:
         msg (dict): map commands received by the socket to canned
            answers.
@@ -459,63 +1677,148 @@ class TesterSocket(object):
     """
     def __init__(self, *args, **kwargs):
         self.msg = {}
-        self._buffer = []
+        self._buffer = _deque()
         self.newline = "\r\n"
 
     def write(self, message):
         """Buffer the canned answer for `message`."""
-        logging.getLogger(__name__).debug("WRITE %r" % message)
-        # should split on self.newline
+        _logger.debug("WRITE %r", message)
+        socketStats(self).recordWrite(len(message))
         self._buffer.extend(splitlines(self.msg[message], self.newline))
 
     def read(self, n):
         """Return `n` characters from the buffer."""
-        line = self.readline()
+        try:
+            line = self._buffer.popleft()
+        except IndexError:
+            line = ""
         ans, line = line[0:n], line[n:]
         if line:
-            self._buffer.insert(0, line)
-        logging.getLogger(__name__).debug("READ %i %r" % (n, ans))
+            self._buffer.appendleft(line)
+        socketStats(self).recordRead(len(ans), timeout=not ans)
+        _logger.debug("READ %i %r", n, ans)
         return ans
 
     def readline(self):
         """Return one line in the buffer."""
-        logger = logging.getLogger(__name__)
         try:
-            line = self._buffer.pop(0)
+            line = self._buffer.popleft()
         except IndexError:
-            logger.debug("Timeout")
+            _logger.debug("Timeout")
             line = ""
-        logger.debug("LINE %r" % line)
+        socketStats(self).recordRead(len(line), timeout=not line)
+        _logger.debug("LINE %r", line)
         return line
 
     def inWaiting(self):
         """Return True is the buffer is not empty."""
         return True if self._buffer else False
 
+    def flushInput(self):
+        """Drop the buffer."""
+        self._buffer.clear()
+
 
 class Serial(serial.Serial):
 
-    """Fix `readline()` in `pyserial`."""
+    """Buffered `readline()` for `pyserial`.
+
+    The bytes waiting on the port are read in one go into an internal
+    buffer that is then split on `newline`.
 
+    Attributes:
+        newline: The end-of-line marker used by `readline()`.
+
+    """
     def __init__(self, port=None, newline="\n", *args, **kwargs):
+        self._rbuffer = bytearray()
         super(Serial, self).__init__(port, *args, **kwargs)
         self.newline = newline
 
+    def _fill(self):
+        """Append the bytes waiting on the port to the buffer.
+
+        Block until at least one byte arrives or `timeout` expires.
+
+        Returns:
+            int: The number of bytes read.
+
+        """
+        chunk = super(Serial, self).read(
+            max(1, super(Serial, self).inWaiting()))
+        self._rbuffer.extend(chunk)
+        return len(chunk)
+
+    def inWaiting(self):
+        """Return the number of bytes buffered or waiting on the port."""
+        return len(self._rbuffer) + super(Serial, self).inWaiting()
+
+    def flushInput(self):
+        """Clear the buffer and the input buffer of the port."""
+        del self._rbuffer[:]
+        super(Serial, self).flushInput()
+
+    def read(self, size=1):
+        """Read `size` bytes and count them in the `socketStats()`."""
+        if len(self._rbuffer) < size:
+            self._rbuffer.extend(super(Serial, self).read(
+                size - len(self._rbuffer)))
+        data = bytes(self._rbuffer[:size])
+        del self._rbuffer[:size]
+        socketStats(self).recordRead(
+            len(data), timeout=bool(self.timeout) and len(data) < size)
+        return data
+
+    def readinto(self, b):
+        """Read up to `len(b)` bytes into the writable buffer `b`.
+
+        `b` may be a `bytearray` or a `memoryview` on one so that binary
+        protocols parse the frames without copies.
+
+        Returns:
+            int: The number of bytes read.
+
+        """
+        size = len(b)
+        if len(self._rbuffer) < size:
+            self._rbuffer.extend(super(Serial, self).read(
+                size - len(self._rbuffer)))
+        n = min(size, len(self._rbuffer))
+        b[:n] = self._rbuffer[:n]
+        del self._rbuffer[:n]
+        socketStats(self).recordRead(
+            n, timeout=bool(self.timeout) and n < size)
+        return n
+
+    def write(self, data):
+        """Write `data` and count them in the `socketStats()`."""
+        socketStats(self).recordWrite(len(data))
+        return super(Serial, self).write(data)
+
     def readline(self):
-        """Implement own readline since changing EOL character with `io`
-        does not work well.
+        """Return one line ending with `newline`.
+
+        Implement own readline since changing EOL character with `io`
+        does not work well.  The line is incomplete if the `timeout`
+        expires.  An empty `newline` ends the lines with "\\n".
 
         """
-        _start = time.time()
-        if not self.newline:
-            return super(Serial, self).readline()
-        line = ""
-        while not line.endswith(self.newline):
-            c = self.read(1)
-            if (not c and self.timeout and
-                    time.time() - _start > self.timeout):
-                # No time out set, but nothing on the line
+        newline = self.newline or "\n"
+        start = time.time()
+        index, end = 0, -1
+        while True:
+            end = self._rbuffer.find(newline, index)
+            if end != -1:
+                end += len(newline)
                 break
-            else:
-                line += c
+            # Only search the new bytes next time.
+            index = max(0, len(self._rbuffer) - len(newline) + 1)
+            if (not self._fill() or self.timeout is not None and
+                    time.time() - start > self.timeout):
+                end = len(self._rbuffer)
+                break
+        line = bytes(self._rbuffer[:end])
+        del self._rbuffer[:end]
+        socketStats(self).recordRead(
+            len(line), timeout=not line.endswith(newline))
         return line
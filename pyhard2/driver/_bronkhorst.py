@@ -3,10 +3,14 @@
 
 The protocol is described in the instruction manual number 9.17.027.
 The implementation uses the `Construct library <http://construct.readthedocs.org/en/latest/>`__.
+The protocols use the precompiled `struct` codecs returned by `codec()`,
+the `Construct` definitions are kept as the reference.
 
 """
 from binascii import unhexlify
 import unittest
+import struct
+from collections import OrderedDict
 from construct import *
 
 
@@ -55,7 +59,18 @@ read_command = Struct("request",
     Terminator
 )
 
+_write_commands = {}
+
+
 def write_command(type_, secured):
+    try:
+        return _write_commands[type_, secured]
+    except KeyError:
+        cmd = _write_commands[type_, secured] = _write_command(type_, secured)
+        return cmd
+
+
+def _write_command(type_, secured):
     return Struct("send",
     Embed(header),
     OneOf(command, ['write', 'write_no_status']),
@@ -90,10 +105,7 @@ error_message = Struct("FLOW-BUS error",
     )
 )
 
-status_message = Struct("FLOW-BUS status",
-    Embed(header),
-    command,
-    Enum(Byte("status"),
+status = Enum(Byte("status"),
         no_error = 0x00,
         process_claimed = 0x01,
         command_error = 0x02,
@@ -130,12 +142,249 @@ status_message = Struct("FLOW-BUS status",
         send_error = 0x21,
         com_error_2 = 0x22,
         module_buffer_overflow = 0x23
-    ),
+)
+
+status_message = Struct("FLOW-BUS status",
+    Embed(header),
+    command,
+    status,
     Byte("byte_index"),
     Terminator
 )
 
 
+_TYPES = dict(c=0x00, i=0x20, f=0x40, l=0x40, s=0x60)
+_VALUES = dict(c=struct.Struct(">B"), i=struct.Struct(">H"),
+               f=struct.Struct(">f"), l=struct.Struct(">I"))
+_SECURED_HEAD, _SECURED_TAIL = "\x80\x0a\x40", "\x00\x0a\x52"
+_READ, _WRITE, _WRITE_NO_STATUS = 4, 1, 2
+
+
+class ReadCodec(object):
+
+    """Precompiled codec for the FLOW-BUS read requests.
+
+    Parameters:
+        type_ (str): {c, i, f, l, s} The type of the parameter.
+
+    """
+    def __init__(self, type_):
+        self.type = type_
+        self._type = _TYPES[type_]
+        self._frame = struct.Struct(">8B" if type_ == "s" else ">7B")
+        self._length = self._frame.size - 1
+
+    def encode(self, node, process, param, index=1):
+        """Return the request for `param` of `process` on `node`."""
+        return self._frame.pack(self._length, node, _READ,
+                                process, self._type | index,
+                                process, self._type | param,
+                                *((0,) if self.type == "s" else ()))
+
+    def decode(self, frame):
+        """Return `(node, process, param)` from the request `frame`.
+
+        Raises:
+            ValidationError: if `frame` is not a read request.
+
+        """
+        if len(frame) != self._frame.size:
+            raise ValidationError("invalid read request", frame)
+        fields = self._frame.unpack(frame)
+        if fields[2] != _READ:
+            raise ValidationError("invalid command", fields[2])
+        return fields[1], fields[5] & 0x7f, fields[6] & 0x1f
+
+
+class WriteCodec(object):
+
+    """Precompiled codec for the FLOW-BUS write requests and replies.
+
+    Parameters:
+        type_ (str): {c, i, f, l, s} The type of the parameter.
+        secured (bool): Wrap the frame to write a secured parameter.
+
+    """
+    def __init__(self, type_, secured=False):
+        self.type = type_
+        self.secured = secured
+        self._type = _TYPES[type_]
+        self._value = _VALUES.get(type_)
+        self._head = _SECURED_HEAD if secured else ""
+        self._tail = _SECURED_TAIL if secured else ""
+        self._start = 3 + len(self._head) + 2  # index of the value
+
+    def encode(self, node, process, param, value, status=True):
+        """Return the request writing `value` to `param`.
+
+        The node does not answer if `status` is False.
+
+        """
+        value = ("\x00%s\x00" % value if self._value is None else
+                 self._value.pack(value))
+        body = "".join((
+            chr(node), chr(_WRITE if status else _WRITE_NO_STATUS), self._head,
+            chr(process | 0x80 if self.secured else process),
+            chr(self._type | param), value, self._tail))
+        return chr(len(body)) + body
+
+    def decode(self, frame):
+        """Return `(node, process, param, value)` from `frame`.
+
+        Raises:
+            ValidationError: if `frame` is not a write request or reply
+                of this type.
+
+        """
+        start, end = self._start, len(frame) - len(self._tail)
+        if (end < start or ord(frame[2]) not in (_WRITE, _WRITE_NO_STATUS) or
+                frame[3:start - 2] != self._head or frame[end:] != self._tail):
+            raise ValidationError("invalid write frame", frame)
+        if self._value is None:
+            if end <= start:
+                raise ValidationError("invalid string", frame)
+            # string_length 0 announces a null-terminated string
+            size, value = ord(frame[start]), frame[start + 1:end]
+            if size == 0 and value.find("\x00") == len(value) - 1:
+                value = value[:-1]
+            elif size == 0 or size != len(value):
+                raise ValidationError("invalid string", frame)
+        elif end - start == self._value.size:
+            value, = self._value.unpack(frame[start:end])
+        else:
+            raise ValidationError("invalid value", frame)
+        return (ord(frame[1]), ord(frame[start - 2]) & 0x7f,
+                ord(frame[start - 1]) & 0x1f, value)
+
+
+class StatusCodec(object):
+
+    """Precompiled decoder for the FLOW-BUS status messages."""
+
+    _frame = struct.Struct(">5B")
+    _names = status.decoding
+
+    def decode(self, frame):
+        """Return `(node, status, byte_index)` from `frame`.
+
+        Raises:
+            ValidationError: if `frame` is not a status message.
+
+        """
+        if len(frame) != self._frame.size:
+            raise ValidationError("invalid status message", frame)
+        __, node, __, code, index = self._frame.unpack(frame)
+        try:
+            return node, self._names[code], index
+        except KeyError:
+            raise ValidationError("invalid status", code)
+
+
+class ChainedReadCodec(object):
+
+    """Codec for the FLOW-BUS read requests chaining several parameters.
+
+    The parameters are grouped by process; the chained flag of a
+    process byte announces another process and the chained flag of an
+    index byte another parameter of the same process.  The `n`-th
+    parameter requested is answered at index `n + 1`.
+
+    """
+    maxLength = 31  # the index is 5 bits
+
+    def encode(self, node, params):
+        """Return the request for `params` on `node`.
+
+        Parameters:
+            params (list): `(process, param, type_)` tuples.
+
+        """
+        processes = OrderedDict()
+        for index, (process, param, type_) in enumerate(params, 1):
+            processes.setdefault(process, []).append((index, param, type_))
+        body = [chr(node), chr(_READ)]
+        for nprocess, (process, group) in enumerate(processes.iteritems(), 1):
+            body.append(chr(process | (0x80 if nprocess < len(processes)
+                                       else 0)))
+            for nparam, (index, param, type_) in enumerate(group, 1):
+                body.append(chr(_TYPES[type_] | index |
+                                (0x80 if nparam < len(group) else 0)))
+                body.append(chr(process) + chr(_TYPES[type_] | param))
+                if type_ == "s":
+                    body.append("\x00")
+        body = "".join(body)
+        return chr(len(body)) + body
+
+    def decode(self, frame, params):
+        """Return the values of `params` in the answer `frame`.
+
+        Raises:
+            ValidationError: if `frame` does not answer every parameter.
+
+        """
+        types = dict(((process, index), type_) for index, (process, __, type_)
+                     in enumerate(params, 1))
+        values = {}
+        if len(frame) < 3 or ord(frame[2]) != _WRITE_NO_STATUS:
+            raise ValidationError("invalid chained answer", frame)
+        pos, end = 3, len(frame)
+        try:
+            moreProcesses = True
+            while moreProcesses:
+                process = ord(frame[pos])
+                moreProcesses, process = process & 0x80, process & 0x7f
+                pos += 1
+                moreParams = True
+                while moreParams:
+                    index = ord(frame[pos])
+                    moreParams, index = index & 0x80, index & 0x1f
+                    type_ = types[process, index]
+                    pos += 1
+                    if type_ == "s":
+                        size = ord(frame[pos])
+                        if size == 0:
+                            stop = frame.index("\x00", pos + 1)
+                            values[index] = frame[pos + 1:stop]
+                            pos = stop + 1
+                        else:
+                            values[index] = frame[pos + 1:pos + 1 + size]
+                            pos += 1 + size
+                    else:
+                        value = _VALUES[type_]
+                        values[index], = value.unpack_from(frame, pos)
+                        pos += value.size
+        except (IndexError, KeyError, ValueError, struct.error):
+            raise ValidationError("invalid chained answer", frame)
+        if pos != end or len(values) != len(params):
+            raise ValidationError("invalid chained answer", frame)
+        return [values[index] for index in range(1, len(params) + 1)]
+
+
+_codecs = dict(status=StatusCodec(), chained=ChainedReadCodec())
+_codecs.update((("read", type_, False), ReadCodec(type_)) for type_ in _TYPES)
+_codecs.update((("write", type_, secured), WriteCodec(type_, secured))
+               for type_ in _TYPES for secured in (False, True))
+
+
+def codec(command, type_=None, secured=False):
+    r"""Return the precompiled codec for the frames of `command`.
+
+    Parameters:
+        command (str): {read, write, status, chained}
+        type_ (str): {c, i, f, l, s} The type of the parameter.
+        secured (bool): True for the secured write requests.
+
+    Example:
+        >>> codec("read", "c").encode(3, 1, 1)
+        '\x06\x03\x04\x01\x01\x01\x01'
+        >>> codec("write", "i").decode('\x06\x03\x02\x01!>\x80')
+        (3, 1, 1, 16000)
+
+    """
+    return (_codecs[command] if command in ("status", "chained") else
+            _codecs[command, type_, secured])
+
+
 class _Data(object):
 
     class Byte(object):
@@ -268,3 +517,56 @@ class TestFlowBus(unittest.TestCase):
             write_command("i", True).build(write_command("i", True).parse(msg)),
             msg)
 
+
+class TestCodec(unittest.TestCase):
+
+    def test_read_codec(self):
+        for type_ in "cifls":
+            Reader.index = 1
+            msg = read_command.build(Reader(3, 104, 7, type_))
+            self.assertEqual(codec("read", type_).encode(3, 104, 7), msg)
+            self.assertEqual(codec("read", type_).decode(msg), (3, 104, 7))
+
+    def test_write_codec(self):
+        for type_, value in dict(c=10, i=16000, f=5023.5, l=2 ** 20,
+                                 s="WATER").iteritems():
+            for secured in (False, True):
+                msg = Writer(3, 1, 2, type_, secured, value).build()
+                self.assertEqual(codec("write", type_, secured).encode(
+                    3, 1, 2, value), msg)
+                self.assertEqual(codec("write", type_, secured).decode(msg),
+                                 (3, 1, 2, value))
+
+    def test_write_codec_string_length(self):
+        self.assertEqual(codec("write", "s").decode(
+            unhexlify("0A0302716605555345525A")), (3, 113, 6, "USERZ"))
+
+    def test_write_codec_invalid(self):
+        for msg in ("0403000005", "06030101213E", "0603010121", "070301017100"
+                    "55"):
+            self.assertRaises(ValidationError,
+                              codec("write", "s" if msg.endswith("55")
+                                    else "i").decode, unhexlify(msg))
+
+    def test_status_codec(self):
+        self.assertEqual(codec("status").decode(unhexlify("0403000005")),
+                         (3, "no_error", 5))
+        self.assertRaises(ValidationError,
+                          codec("status").decode, unhexlify("06030101213E80"))
+
+    def test_chained_codec(self):
+        params = [(1, 0, "i"), (1, 1, "i"), (114, 1, "l"), (1, 17, "s")]
+        self.assertEqual(codec("chained").encode(3, params),
+                         unhexlify("110304" "81" "A10120" "A20121" "6401710072"
+                                   "437241"))
+        self.assertEqual(codec("chained").decode(unhexlify(
+            "170302" "81" "A13E80" "A23E80" "64005741544552" "0072" "4300F00000"),
+            params), [16000, 16000, 0xF00000, "WATER"])
+
+    def test_chained_codec_missing(self):
+        self.assertRaises(ValidationError, codec("chained").decode,
+                          unhexlify("06030201213E80"), [(1, 1, "i"), (1, 0, "i")])
+
+    def test_write_command_cached(self):
+        self.assertIs(write_command("f", True), write_command("f", True))
+
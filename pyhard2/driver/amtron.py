@@ -190,7 +190,8 @@ class CS400(Subsystem):
              0x8000: "wrong command"}), access=Access.RO)
         self.warnings = Cmd(0x03, rfunc=_parse_bits({0x0080: "startup is delayed"}), access=Access.RO)
         self.configuration = Cmd(0x05, minimum=0x0, maximum=0x8001)
-        self.firmware = Cmd(0x07, rfunc=partial(mul, 0.001), access=Access.RO)
+        self.firmware = Cmd(0x07, rfunc=partial(mul, 0.001), access=Access.RO,
+                            cache_ttl=3600.0)
         self.operation_mode = Cmd(0x0A, minimum=0, maximum=4)
         self._gate = Cmd(0x0B, minimum=0, maximum=0xffff)
         self._command = Cmd(0x0D, minimum=0, maximum=24)
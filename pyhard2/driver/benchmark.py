@@ -0,0 +1,307 @@
+"""Benchmark the protocols of the drivers.
+
+Every benchmark drives an instrument through a `TesterSocket` with
+canned answers so that the time measured is spent in the driver: path
+building, encoding, framing, parsing, and error checking.  Run::
+
+    python -m pyhard2.driver.benchmark --output benchmark.json
+
+The results are printed and saved as JSON so that they may be compared
+between revisions.  The time to import the driver core and the memory
+used by every `Command` are measured in fresh interpreters.
+
+"""
+import unittest
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from binascii import unhexlify
+import pyhard2.driver as drv
+
+
+class Benchmark(object):
+
+    """A named operation on an instrument.
+
+    Parameters:
+        name (str): The name of the benchmark, `driver.operation`.
+        setup (callable): Return the instrument.
+        operation (callable): Called with the instrument.
+
+    """
+    def __init__(self, name, setup, operation):
+        self.name = name
+        self.setup = setup
+        self.operation = operation
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.name)
+
+    def run(self, duration=1.0):
+        """Repeat the operation during at least `duration` seconds.
+
+        Returns:
+            dict: `name`, `iterations`, `seconds`, and `ops_per_sec`.
+
+        """
+        instrument = self.setup()
+        operation = self.operation
+        operation(instrument)  # warm up the caches
+        iterations, batch = 0, 1
+        start = time.time()
+        while True:
+            for __ in xrange(batch):
+                operation(instrument)
+            iterations += batch
+            elapsed = time.time() - start
+            if elapsed >= duration:
+                break
+            batch *= 2
+        return dict(name=self.name, iterations=iterations, seconds=elapsed,
+                    ops_per_sec=iterations / elapsed if elapsed else None)
+
+
+def _tester(msg):
+    socket = drv.TesterSocket()
+    socket.msg = msg
+    return socket
+
+
+def _bronkhorst():
+    from pyhard2.driver.bronkhorst import Controller
+    return Controller(_tester({
+        ":06030101213E80\r\n": ":0403000005\r\n",
+        ":06030401210121\r\n": ":06030201213E80\r\n",
+        ":06030468416841\r\n": ":0803026841459cffae\r\n",
+    }))
+
+
+def _bronkhorst_binary():
+    from pyhard2.driver.bronkhorst import Controller, BinaryProtocol, Simulator
+    socket = Simulator([3], protocol=BinaryProtocol)
+    socket.params[3, 1, 1] = "\x3e\x80"
+    return Controller(socket, protocol=BinaryProtocol)
+
+
+def _flowbus_parse(__):
+    from pyhard2.driver._bronkhorst import read_command
+    read_command.parse(unhexlify("06030401210121"))
+
+
+def _flowbus_build(__):
+    from pyhard2.driver._bronkhorst import read_command, Reader
+    read_command.build(Reader(3, 1, 1, "c"))
+
+
+def _codec_decode(__):
+    from pyhard2.driver._bronkhorst import codec
+    codec("write", "i").decode(unhexlify("06030201213E80"))
+
+
+def _codec_encode(__):
+    from pyhard2.driver._bronkhorst import codec
+    codec("read", "c").encode(3, 1, 1)
+
+
+def _scpi():
+    from pyhard2.driver.ieee.scpi import ScpiPowerSupply
+    return ScpiPowerSupply(_tester({
+        "SOUR:VOLT?\n": "1.7\n",
+        "SOUR:CURR?\n": "0.5\n",
+        "SOUR:VOLT?;:SOUR:CURR?\n": "1.7;0.5\n",
+    }))
+
+
+def _amtron():
+    from pyhard2.driver.amtron import CS400
+    return CS400(_tester({
+        ":r 00E\r": ":r 00E\r\n:0\r\n:OK   \r\n",
+        ":w 60B 5\r": ":w 60B 5\r\n:OK   \r\n",
+    }))
+
+
+def _digitek():
+    from pyhard2.driver.digitek import DT80k
+    return DT80k(_tester({
+        "\x89": "\x89\xA8\xC0\x81\x40\x30\x30\x30\x35\x33\x38\x0A"}))
+
+
+def _pfeiffer():
+    from pyhard2.driver.pfeiffer import Maxigauge
+    return Maxigauge(_tester({"PR1\r\n": "\x06\r\n0,1.234E-2\r\n",
+                              "PRX\r\n": "\x06\r\n" + ",".join(
+                                  ["0,1.234E-2"] * 6) + "\r\n",
+                              "\x05\r\n": ""}))
+
+
+def _watlow():
+    from pyhard2.driver.watlow import Series988
+    return Series988(_tester({"? SP1\r": "\x13\x1125\r",
+                              "? ER2\r": "\x13\x110\r",
+                              "? AMB\r": "\x13\x1172\r",
+                              "= SP1 32\r": "\x13\x11"}))
+
+
+def _fluke():
+    from pyhard2.driver.fluke import Fluke18x
+    return Fluke18x(_tester({"QM\r": "0\rQM,+47.66 KOhms\r"}))
+
+
+def _peaktech():
+    from pyhard2.driver.peaktech import Pt1885
+    return Pt1885(_tester({"GETD00\r": "012003\rOK\r",
+                           "GETS00\r": "012003\rOK\r",
+                           "VOLT00014\r": "OK\r"}))
+
+
+def _deltaelektronika():
+    from pyhard2.driver.deltaelektronika import Sm700Series
+    return Sm700Series(_tester({"U\n": "13\r\n\x04",
+                                "SO:VO?\n": "0.25\r\n\x04",
+                                "SO:VO 0.25\n": ""}))
+
+
+BENCHMARKS = [
+    Benchmark("bronkhorst.read", _bronkhorst,
+              lambda i: i.setpoint.read(node=3)),
+    Benchmark("bronkhorst.read_float", _bronkhorst,
+              lambda i: i.counter.value.read(node=3)),
+    Benchmark("bronkhorst.write", _bronkhorst,
+              lambda i: i.setpoint.write(50, node=3)),
+    Benchmark("bronkhorst.read_binary", _bronkhorst_binary,
+              lambda i: i.setpoint.read(node=3)),
+    Benchmark("bronkhorst.flowbus_parse", lambda: None,
+              _flowbus_parse),
+    Benchmark("bronkhorst.flowbus_build", lambda: None,
+              _flowbus_build),
+    Benchmark("bronkhorst.codec_decode", lambda: None,
+              _codec_decode),
+    Benchmark("bronkhorst.codec_encode", lambda: None,
+              _codec_encode),
+    Benchmark("scpi.read", _scpi, lambda i: i.source.voltage.read()),
+    Benchmark("scpi.read_many", _scpi,
+              lambda i: i.readMany([(i.source.voltage, None),
+                                    (i.source.current, None)])),
+    Benchmark("amtron.read", _amtron, lambda i: i.command.is_ready.read()),
+    Benchmark("amtron.write", _amtron,
+              lambda i: i.interface.pilot_beam_intensity.write(5)),
+    Benchmark("digitek.read", _digitek, lambda i: i.measure.read()),
+    Benchmark("pfeiffer.read", _pfeiffer,
+              lambda i: i.gauge.pressure.read(node=1)),
+    Benchmark("pfeiffer.read_many", _pfeiffer,
+              lambda i: i.readMany([(i.gauge.pressure, node)
+                                    for node in range(1, 7)])),
+    Benchmark("watlow.read", _watlow, lambda i: i.setpoint.read()),
+    Benchmark("watlow.read_nested", _watlow,
+              lambda i: i.factory.diagnostic.ambient_temperature.read()),
+    Benchmark("watlow.write", _watlow, lambda i: i.setpoint.write(32)),
+    Benchmark("fluke.read", _fluke, lambda i: i.measure.read()),
+    Benchmark("peaktech.read", _peaktech, lambda i: i.voltage.read()),
+    Benchmark("peaktech.write", _peaktech, lambda i: i.voltage.write(1.4)),
+    Benchmark("deltaelektronika.read_dpl", _deltaelektronika,
+              lambda i: i.dpl.voltage.read()),
+    Benchmark("deltaelektronika.read_scpi", _deltaelektronika,
+              lambda i: i.source.voltage.read()),
+    Benchmark("deltaelektronika.write_scpi", _deltaelektronika,
+              lambda i: i.source.voltage.write(0.25)),
+]
+
+
+def run(benchmarks=None, duration=1.0, pattern=""):
+    """Run the `benchmarks` whose name contains `pattern`.
+
+    Returns:
+        list: The results of `Benchmark.run()`.
+
+    """
+    return [benchmark.run(duration)
+            for benchmark in (benchmarks if benchmarks else BENCHMARKS)
+            if pattern in benchmark.name]
+
+
+def _python(code):
+    """Run `code` in a fresh interpreter and return its output."""
+    import pyhard2
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(pyhard2.__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, (root, env.get("PYTHONPATH"))))
+    return subprocess.check_output([sys.executable, "-c", code], env=env)
+
+
+def importTime(module="pyhard2.driver", repeat=5):
+    """Return the shortest time in seconds to import `module` in a
+    fresh interpreter."""
+    return min(float(_python("\n".join((
+        "import time",
+        "start = time.time()",
+        "import %s" % module,
+        "print(time.time() - start)")))) for __ in range(repeat))
+
+
+def commandMemory(count=100000):
+    """Return the memory in bytes used by every `Command`.
+
+    The resident memory of a fresh interpreter is measured before and
+    after creating `count` `Commands` in a `Subsystem`.
+
+    """
+    return float(_python("\n".join((
+        "import resource, sys",
+        "import pyhard2.driver as drv",
+        "def rss():",
+        "    try:",
+        "        with open('/proc/self/statm') as statm:",
+        "            pages = int(statm.read().split()[1])",
+        "        return pages * resource.getpagesize()",
+        "    except IOError:  # peak memory, in bytes on OS X",
+        "        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss",
+        "        return rss if sys.platform == 'darwin' else 1024 * rss",
+        "before = rss()",
+        "subsystem = drv.Subsystem()",
+        "for n in range(%i):" % count,
+        "    setattr(subsystem, 'c%i' % n, drv.Command('VAL'))",
+        "print(float(rss() - before) / %i)" % count))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="save the results as JSON")
+    parser.add_argument("-d", "--duration", type=float, default=1.0,
+                        help="seconds per benchmark (default: %(default)s)")
+    parser.add_argument("-k", "--pattern", default="",
+                        help="only run the benchmarks matching PATTERN")
+    args = parser.parse_args(argv)
+    results = run(duration=args.duration, pattern=args.pattern)
+    for result in results:
+        print("%-32s %12.0f ops/s" % (result["name"], result["ops_per_sec"]))
+    core = dict(import_seconds=importTime(), command_bytes=commandMemory())
+    print("%-32s %12.1f ms" % ("driver.import", 1000 * core["import_seconds"]))
+    print("%-32s %12.0f bytes" % ("driver.command", core["command_bytes"]))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(dict(python=sys.version.split()[0],
+                           platform=platform.platform(),
+                           date=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                           results=results, core=core),
+                      output, indent=2, sort_keys=True)
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_run(self):
+        results = run(duration=0.0)
+        self.assertEqual([result["name"] for result in results],
+                         [benchmark.name for benchmark in BENCHMARKS])
+
+    def test_core(self):
+        self.assertGreater(importTime(repeat=1), 0.0)
+        self.assertGreater(commandMemory(count=20000), 0.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ manual number 9.17.027.  The commands and subsystems are described in
 the instruction manual number 9.17.023.
 
 Note:
-    - The ASCII protocol is implemented.
+    - The ASCII and the binary protocols are implemented.
     - This driver requires the `Construct library
       <http://construct.readthedocs.org/en/latest/>`_.
 
@@ -20,10 +20,11 @@ Reference:
 """
 import unittest
 from binascii import hexlify, unhexlify
+from collections import OrderedDict
 
 import pyhard2.driver as drv
 
-from _bronkhorst import Reader, Writer, Status, ValidationError
+from _bronkhorst import Reader, codec, ValidationError
 
 
 class BronkhorstHardwareError(drv.HardwareError): pass
@@ -99,12 +100,30 @@ ULONG = 'l'
 STRING = 's'
 
 
+BROADCAST = 128
+
+
 class AsciiProtocol(drv.CommunicationProtocol):
 
     """ASCII protocol."""
 
     def __init__(self, socket):
         super(AsciiProtocol, self).__init__(socket)
+        self._nodes = frozenset()
+
+    def nodes(self):
+        """Return the nodes on the bus."""
+        return self._nodes
+
+    def setNodes(self, nodes):
+        """Set the nodes on the bus.
+
+        `writeMany()` broadcasts the values written to every node in
+        `nodes`.  The nodes are unknown by default and the values are
+        never broadcast.
+
+        """
+        self._nodes = frozenset(nodes)
 
     err = {":0101": "no ':' at the start of the message",
            ":0102": "error in first byte",
@@ -116,47 +135,406 @@ class AsciiProtocol(drv.CommunicationProtocol):
 
     @staticmethod
     def toAscii(bytes_):
-        return ":%s\r\n" % hexlify(bytes_).upper()
+        return ":" + hexlify(bytes_).upper() + "\r\n"
 
     @staticmethod
     def toBytes(ascii_):
-        return unhexlify(ascii_[1:-2])  # do not convert ":" and "\r\n"
+        # do not convert ":" and "\r\n"
+        return unhexlify(ascii_[1:-2] if ascii_.endswith("\r\n")
+                         else ascii_[1:])
+
+    toMessage, fromMessage = toAscii, toBytes
+
+    @staticmethod
+    def splitMessage(data):
+        """Return the first message in `data` and the rest of `data`.
+
+        The message is None if `data` does not contain a complete
+        message.
+
+        """
+        end = data.find("\r\n")
+        if end == -1:
+            return None, data
+        return data[:end + 2], data[end + 2:]
+
+    def _readMessage(self):
+        return self._socket.readline()
+
+    def _answerNode(self, ans):
+        """Return the node that sent `ans` or None if `ans` does not
+        tell, e.g., a FLOW-BUS error."""
+        try:
+            frame = self.fromMessage(ans)
+        except (ValidationError, TypeError):
+            return None
+        if len(frame) < 2 or ord(frame[0]) < 2:
+            return None
+        return ord(frame[1])
+
+    def _readAnswers(self, contexts):
+        """Return the answers to the requests sent for `contexts`.
+
+        The answers are matched to the contexts by node, in order for
+        the same node; the answers without node go to the first context
+        still waiting.  The contexts without answer get None.
+
+        """
+        answers = [None] * len(contexts)
+        waiting = range(len(contexts))
+        while waiting:
+            ans = self._readMessage()
+            if not ans:
+                break  # timeout
+            node = self._answerNode(ans)
+            for index in waiting:
+                if node is None or contexts[index].node == node:
+                    waiting.remove(index)
+                    answers[index] = ans
+                    break
+        return answers
+
+    @staticmethod
+    def _readFrame(context):
+        return codec("read", context.type).encode(
+            context.node, context.subsystem.process, context.reader,
+            Reader.index)
+
+    @staticmethod
+    def _writeFrame(context, secured=None):
+        if secured is None:
+            secured = context._command.access == Access.SEC
+        return codec("write", context.type, secured).encode(
+            context.node, context.subsystem.process, context.writer,
+            context.value)
 
     def read(self, context):
-        construct = Reader.fromContext(context)
-        self._socket.write(self.toAscii(construct.build()))
-        ans = self._socket.readline()
+        self._socket.write(self.toMessage(self._readFrame(context)))
+        ans = self._readMessage()
         try:
-            return Writer.parse(self.toBytes(ans), context.type).value
-        except ValidationError:
+            return codec("write", context.type).decode(self.fromMessage(ans))[-1]
+        except (ValidationError, TypeError):
             # format is not WRITE, check STATUS
-            self._check_error(construct, ans)
+            self._check_error(context, ans)
+
+    def readMany(self, contexts):
+        """Chain the requests to the same node into one message.
+
+        Example:
+            Read measure, setpoint, valve output and fluid from node 3
+            in a single exchange::
+
+                i.readMany([(i.measure, 3), (i.setpoint, 3),
+                            (i.controller.valve_output, 3), (i.fluid, 3)])
+
+        """
+        nodes = OrderedDict()
+        for index, context in enumerate(contexts):
+            nodes.setdefault(context.node, []).append(index)
+        chained = codec("chained")
+        values = [None] * len(contexts)
+        for node, indices in nodes.iteritems():
+            for start in range(0, len(indices), chained.maxLength):
+                chain = [contexts[index] for index
+                         in indices[start:start + chained.maxLength]]
+                if len(chain) == 1:
+                    answers = super(AsciiProtocol, self).readMany(chain)
+                else:
+                    answers = self._readChain(node, chain)
+                for index, answer in zip(
+                        indices[start:start + chained.maxLength], answers):
+                    values[index] = answer
+        return values
+
+    def _readChain(self, node, contexts):
+        params = [(context.subsystem.process, context.reader, context.type)
+                  for context in contexts]
+        self._socket.write(self.toMessage(codec("chained").encode(node, params)))
+        ans = self._readMessage()
+        try:
+            return codec("chained").decode(self.fromMessage(ans), params)
+        except (ValidationError, TypeError):
+            try:
+                self._check_error(contexts[0], ans)
+                error = BronkhorstHardwareError(
+                    "Node %i: no value in answer %r" % (node, ans))
+            except drv.HardwareError as e:
+                error = e
+            return [error] * len(contexts)
+
+    def writeMany(self, contexts):
+        """Broadcast identical values and pipeline the other requests.
+
+        A value written to every node in `nodes()` is sent once to the
+        `BROADCAST` node, which does not answer, and read back from
+        every node to get its status.  The other requests are sent at
+        once and their status messages read afterwards.
+
+        Example:
+            Set the same setpoint on every MFC of the bus::
+
+                i.protocol().setNodes(range(3, 12))
+                i.writeMany([(i.setpoint, 50, node)
+                             for node in range(3, 12)])
+
+        """
+        groups = OrderedDict()
+        for index, context in enumerate(contexts):
+            groups.setdefault((
+                context.subsystem.process, context.writer, context.type,
+                context._command.access == Access.SEC, context.value),
+                []).append(index)
+        statuses = [None] * len(contexts)
+        pipeline = []
+        for (process, param, type_, secured, value), indices in (
+                groups.iteritems()):
+            nodes = set(contexts[index].node for index in indices)
+            if (len(indices) > 1 and nodes == self._nodes and
+                    len(nodes) == len(indices)):
+                self._socket.write(self.toMessage(
+                    codec("write", type_, secured).encode(
+                        BROADCAST, process, param, value, status=False)))
+                for index, status in zip(indices, self._readBack(
+                        [contexts[index] for index in indices])):
+                    statuses[index] = status
+            else:
+                pipeline.extend(indices)
+        if len(pipeline) == 1:
+            statuses[pipeline[0]], = super(AsciiProtocol, self).writeMany(
+                [contexts[pipeline[0]]])
+        elif pipeline:
+            self._socket.write("".join(
+                self.toMessage(self._writeFrame(contexts[index]))
+                for index in pipeline))
+            for index, ans in zip(pipeline, self._readAnswers(
+                    [contexts[index] for index in pipeline])):
+                try:
+                    if ans is None:
+                        raise BronkhorstHardwareError(
+                            "Node %i: no answer" % contexts[index].node)
+                    self._check_error(contexts[index], ans)
+                except drv.HardwareError as e:
+                    statuses[index] = e
+        return statuses
+
+    def _readBack(self, contexts):
+        """Return the status of the broadcast of `contexts`."""
+        self._socket.write("".join(self.toMessage(self._readFrame(context))
+                                   for context in contexts))
+        statuses = []
+        for context, ans in zip(contexts, self._readAnswers(contexts)):
+            if ans is None:
+                statuses.append(BronkhorstHardwareError(
+                    "Node %i: no answer" % context.node))
+                continue
+            # Compare to the value after encoding, e.g., float32
+            expected = codec("write", context.type).decode(
+                self._writeFrame(context, secured=False))[-1]
+            try:
+                value = codec("write", context.type).decode(
+                    self.fromMessage(ans))[-1]
+            except (ValidationError, TypeError):
+                try:
+                    self._check_error(context, ans)
+                    statuses.append(BronkhorstHardwareError(
+                        "Node %i: no value in answer %r" % (context.node, ans)))
+                except drv.HardwareError as e:
+                    statuses.append(e)
+                continue
+            statuses.append(None if value == expected else
+                            BronkhorstHardwareError(
+                                "Node %i: broadcast %r but read back %r" %
+                                (context.node, expected, value)))
+        return statuses
 
     def write(self, context):
-        construct = Writer.fromContext(context)
-        self._socket.write(self.toAscii(construct.build()))
-        ans = self._socket.readline()
-        self._check_error(construct, ans)
+        self._socket.write(self.toMessage(self._writeFrame(context)))
+        ans = self._readMessage()
+        self._check_error(context, ans)
 
-    @staticmethod
-    def _check_error(construct, ans):
+    def _check_error(self, context, ans):
         try:
             # Assume ans is STATUS message
-            status = Status.parse(AsciiProtocol.toBytes(ans))
-            if not status.startswith("no_error"):
-                status_msg = " ".join(status.split("_"))
-                raise BronkhorstHardwareError(
-                    "Node %i: Command %s returned status: %s" %
-                    (construct.node, construct, status_msg))
-        except BronkhorstHardwareError:
-            # We are done with it, reraise
-            raise
-        except Exception:
+            status = codec("status").decode(self.fromMessage(ans))[1]
+        except (ValidationError, TypeError):
             # not a STATUS message, assume PROTOCOL error or UNKNOWN
             raise BronkhorstHardwareError(
                 "Node %i: Command %r returned error: %s" %
-                (construct.node, construct,
-                 AsciiProtocol.err.get(ans.strip(), "unknown message %r" % ans)))
+                (context.node, context.reader, self._errorText(ans)))
+        if not status.startswith("no_error"):
+            status_msg = " ".join(status.split("_"))
+            raise BronkhorstHardwareError(
+                "Node %i: Command %s returned status: %s" %
+                (context.node, context.reader, status_msg))
+
+    def _errorText(self, ans):
+        try:
+            # the error messages are indexed in ASCII
+            return self.err[self.toAscii(self.fromMessage(ans)).strip()]
+        except (ValidationError, TypeError, KeyError):
+            return "unknown message %r" % ans
+
+
+DLE, STX, ETX = "\x10", "\x02", "\x03"
+
+
+class BinaryProtocol(AsciiProtocol):
+
+    """Binary protocol.
+
+    The frames are those of the `AsciiProtocol` sent as bytes between
+    DLE STX and DLE ETX; the DLE in the frames are doubled.  The
+    messages are about half the size of the ASCII messages.
+
+    """
+    def __init__(self, socket):
+        super(BinaryProtocol, self).__init__(socket)
+        socket.newline = DLE + ETX
+
+    @staticmethod
+    def toMessage(bytes_):
+        return "".join((DLE, STX, bytes_.replace(DLE, DLE + DLE), DLE, ETX))
+
+    @staticmethod
+    def fromMessage(message):
+        if not (message.startswith(DLE + STX) and
+                message.endswith(DLE + ETX)):
+            raise ValidationError("invalid binary message", message)
+        return message[2:-2].replace(DLE + DLE, DLE)
+
+    @staticmethod
+    def splitMessage(data):
+        start = data.find(DLE + STX)
+        if start == -1:
+            return None, data
+        pos = start + 2
+        while True:
+            pos = data.find(DLE, pos)
+            if pos == -1 or pos + 1 == len(data):
+                return None, data
+            if data[pos + 1] == ETX:
+                return data[start:pos + 2], data[pos + 2:]
+            pos += 2  # escaped DLE
+
+    def _readMessage(self):
+        message = ""
+        while True:
+            chunk = self._socket.readline()
+            message += chunk
+            if not chunk.endswith(DLE + ETX):
+                return message  # timeout
+            # The ETX ends the message after an odd number of DLE.
+            body = message[:-1]
+            if (len(body) - len(body.rstrip(DLE))) % 2:
+                return message
+
+
+class Simulator(object):
+
+    """Socket simulating FLOW-BUS instruments, used for testing.
+
+    The parameters keep the raw bytes written so that every type reads
+    back as written; reading a parameter never written returns a
+    `parameter_error` status.
+
+    Parameters:
+        nodes (iterable): The nodes on the bus.
+        protocol: The class framing the messages, `AsciiProtocol` or
+            `BinaryProtocol`.
+
+    Attributes:
+        params (dict): Map `(node, process, param)` to the raw value.
+
+    """
+    def __init__(self, nodes=(3,), protocol=AsciiProtocol):
+        self.nodes = frozenset(nodes)
+        self.params = {}
+        self.newline = "\n"
+        self.timeout = None
+        self._protocol = protocol
+        self._input = self._output = ""
+
+    def write(self, data):
+        """Answer the messages in `data`."""
+        drv.socketStats(self).recordWrite(len(data))
+        self._input += data
+        while True:
+            message, self._input = self._protocol.splitMessage(self._input)
+            if message is None:
+                break
+            try:
+                answer = self._answer(self._protocol.fromMessage(message))
+            except (ValidationError, TypeError, IndexError):
+                answer = "\x01\x04"  # error in received message
+            if answer is not None:
+                self._output += self._protocol.toMessage(answer)
+
+    def read(self, n=1):
+        """Read `n` characters."""
+        data, self._output = self._output[:n], self._output[n:]
+        drv.socketStats(self).recordRead(len(data), timeout=len(data) < n)
+        return data
+
+    def readline(self):
+        """Return one line ending with `newline`."""
+        end = self._output.find(self.newline)
+        end = len(self._output) if end == -1 else end + len(self.newline)
+        line, self._output = self._output[:end], self._output[end:]
+        drv.socketStats(self).recordRead(
+            len(line), timeout=not line.endswith(self.newline))
+        return line
+
+    def inWaiting(self):
+        """Return the number of characters to read."""
+        return len(self._output)
+
+    def flushInput(self):
+        """Drop the characters to read."""
+        self._output = ""
+
+    @staticmethod
+    def _status(node, status, index):
+        return "".join(map(chr, (4, node, 0, status, index)))
+
+    def _answer(self, frame):
+        node, command = ord(frame[1]), ord(frame[2])
+        if node != BROADCAST and node not in self.nodes:
+            return None  # nobody answers
+        if command == 4:
+            return self._read(node, frame)
+        if command in (1, 2):
+            start, end = 3, len(frame)
+            if frame[3] == "\x80":  # secured
+                start, end = 6, end - 3
+            process, param = ord(frame[start]) & 0x7f, ord(frame[start + 1])
+            for target in self.nodes if node == BROADCAST else (node,):
+                self.params[target, process, param & 0x1f] = frame[
+                    start + 2:end]
+            if command == 1 and node != BROADCAST:
+                return self._status(node, 0, len(frame) - 1)
+            return None
+        return self._status(node, 2, 2)  # command error
+
+    def _read(self, node, frame):
+        answer, pos = [chr(node), "\x02"], 3
+        moreProcesses = True
+        while moreProcesses:
+            moreProcesses = ord(frame[pos]) & 0x80
+            answer.append(frame[pos])
+            pos += 1
+            moreParams = True
+            while moreParams:
+                index = ord(frame[pos])
+                moreParams = index & 0x80
+                key = (node, ord(frame[pos + 1]) & 0x7f,
+                       ord(frame[pos + 2]) & 0x1f)
+                pos += 4 if index & 0x60 == 0x60 else 3  # string length
+                try:
+                    answer.extend((chr(index), self.params[key]))
+                except KeyError:
+                    return self._status(node, 4, pos - 1)  # parameter error
+        answer = "".join(answer)
+        return chr(len(answer)) + answer
 
 
 class Controller(Subsystem):
@@ -164,16 +542,21 @@ class Controller(Subsystem):
     """Driver for Bronkhorst controllers.
 
     Note:
-        Node 128 broadcasts to every node.
+        Node 128 broadcasts to every node; `AsciiProtocol.writeMany()`
+        uses it after `AsciiProtocol.setNodes()`.
+
+    Parameters:
+        protocol: `AsciiProtocol` (default) or `BinaryProtocol`, as
+            configured in the instrument.
 
     .. graphviz:: gv/Controller.txt
 
     """
-    def __init__(self, socket):
+    def __init__(self, socket, protocol=AsciiProtocol):
         socket.baudrate = 38400
         socket.timeout = 3
         super(Controller, self).__init__(1)
-        self.setProtocol(AsciiProtocol(socket))
+        self.setProtocol(protocol(socket))
         # Process 1
         self.measure = Cmd(0, rfunc=_measure_to_pct, wfunc=_pct_to_measure,
                            access=Access.RO, type=UINT)
@@ -186,10 +569,11 @@ class Controller(Subsystem):
         self.fluid_ptr = Cmd(16, minimum=0, maximum=7, type=CHAR)
         self.fluid = Cmd(17, type=STRING, access=Access.SEC)
         self.info = Cmd(20, type=CHAR)
-        self.capacity_100pct = Cmd(13, minimum=0.0, type=FLOAT, access=Access.SEC)
+        self.capacity_100pct = Cmd(13, minimum=0.0, type=FLOAT, access=Access.SEC,
+                                   cache_ttl=3600.0)
         self.sensor_type = Cmd(14, minimum=0, maximum=4, type=CHAR, access=Access.SEC)
         self.capacity_unit_ptr = Cmd(15, minimum=0, maximum=9, type=CHAR, access=Access.SEC)
-        self.capacity_unit = Cmd(31, type=STRING, access=Access.SEC)
+        self.capacity_unit = Cmd(31, type=STRING, access=Access.SEC, cache_ttl=3600.0)
         # Direct reading subsystem, process 33
         self.direct_reading = Subsystem(33, self)
         self.direct_reading.capacity_0pct = Cmd(22, type=FLOAT, access=Access.SEC)
@@ -198,12 +582,14 @@ class Controller(Subsystem):
         self.direct_reading.master_slave_ratio = Cmd(1, minimum=0, maximum=500, type=FLOAT)
         # Identification subsystem, process 113
         self.identification = Subsystem(113, self)
-        self.identification.model_number = Cmd(2, type=STRING)
-        self.identification.serial_number = Cmd(3, type=STRING)
-        self.identification.config_string = Cmd(4, type=STRING, access=Access.SEC)
-        self.identification.firmware = Cmd(5, type=STRING)
-        self.identification.usertag = Cmd(6, type=STRING, access=Access.SEC)
-        self.identification.device_type_ptr = Cmd(12, type=CHAR)
+        self.identification.model_number = Cmd(2, type=STRING, cache_ttl=3600.0)
+        self.identification.serial_number = Cmd(3, type=STRING, cache_ttl=3600.0)
+        self.identification.config_string = Cmd(4, type=STRING, access=Access.SEC,
+                                                 cache_ttl=3600.0)
+        self.identification.firmware = Cmd(5, type=STRING, cache_ttl=3600.0)
+        self.identification.usertag = Cmd(6, type=STRING, access=Access.SEC,
+                                          cache_ttl=3600.0)
+        self.identification.device_type_ptr = Cmd(12, type=CHAR, cache_ttl=3600.0)
         # Alarm/status parameters subsystem, process 97
         self.alarm = Subsystem(97, self)
         self.alarm.max_limit = Cmd(1, minimum=0, maximum=32000, type=UINT, access=Access.SEC)
@@ -255,16 +641,16 @@ class MFC(Controller):
 
     """Instrument for mass-flow controllers."""
 
-    def __init__(self, socket):
-        super(MFC, self).__init__(socket)
+    def __init__(self, socket, protocol=AsciiProtocol):
+        super(MFC, self).__init__(socket, protocol)
 
 
 class PC(Controller):
 
     """Instrument for pressure controllers."""
 
-    def __init__(self, socket):
-        super(PC, self).__init__(socket)
+    def __init__(self, socket, protocol=AsciiProtocol):
+        super(PC, self).__init__(socket, protocol)
 
 
 class BronkhorstTest(unittest.TestCase):
@@ -289,7 +675,23 @@ class BronkhorstTest(unittest.TestCase):
             # req valve output (process 114, parameter 1, ULONG), ret 93.75
             ":06030472417241\r\n": ":080302724100f00000\r\n",
             # req usertag (process 113, parameter 6, STRING), ret USER
-            ":0703047161716600\r\n": ":0A03027166005553455200\r\n"
+            ":0703047161716600\r\n": ":0A03027166005553455200\r\n",
+            # req measure, setpoint, valve output, fluid chained
+            ":11030481A10120A201216401710072437241\r\n":
+            ":170302""81A13E80A23E806400574154455200724300F00000\r\n",
+            # req measure, setpoint chained from node 4, not found
+            ":09040401A10120220121\r\n": ":0404000b05\r\n",
+            # set setpoint of nodes 3 and 4 to 50%, pipelined
+            ":06030101213E80\r\n:06040101213E80\r\n":
+            ":0403000005\r\n:0404000b05\r\n",
+            # broadcast setpoint 50%, no answer
+            ":06800201213E80\r\n": "",
+            # read back setpoint of nodes 3 and 4 (-> 50% and 49.6%)
+            ":06030401210121\r\n:06040401210121\r\n":
+            ":06030201213E80\r\n:06040201213E00\r\n",
+            # set setpoint and alarm.max_limit, pipelined
+            ":06030101213E80\r\n:0C0301800A40E121000A000A52\r\n":
+            ":0403000005\r\n:040300000b\r\n",
         }
         self.i = Controller(socket)
 
@@ -332,6 +734,122 @@ class BronkhorstTest(unittest.TestCase):
     def test_read_string(self):
         self.assertEqual(self.i.identification.usertag.read(node=3), "USER")
 
+    def test_read_chained(self):
+        i = self.i
+        measure, setpoint, valve, fluid = i.readMany([
+            (i.measure, 3), (i.setpoint, 3),
+            (i.controller.valve_output, 3), (i.fluid, 3)])
+        self.assertEqual((measure, setpoint, fluid), (50.0, 50.0, "WATER"))
+        self.assertAlmostEqual(valve, 93.75, 2)
+
+    def test_read_chained_nodes(self):
+        i = self.i
+        values = i.readMany([(i.measure, 4), (i.setpoint, 3),
+                             (i.setpoint, 4)])
+        self.assertEqual(values[1], 50.0)
+        self.assertIsInstance(values[0], BronkhorstHardwareError)
+        self.assertIs(values[0], values[2])
+
+    def test_write_many_pipelined(self):
+        i = self.i
+        ok, error = i.writeMany([(i.setpoint, 50, 3), (i.setpoint, 50, 4)])
+        self.assertIsNone(ok)
+        self.assertIsInstance(error, BronkhorstHardwareError)
+
+    def test_write_many_broadcast(self):
+        i = self.i
+        i.protocol().setNodes([3, 4])
+        ok, error = i.writeMany([(i.setpoint, 50, 3), (i.setpoint, 50, 4)])
+        self.assertIsNone(ok)
+        self.assertIn("read back", str(error))
+
+    def test_write_many_commands(self):
+        i = self.i
+        i.protocol().setNodes([3, 4])
+        self.assertEqual(i.writeMany([(i.setpoint, 50, 3),
+                                      (i.alarm.max_limit, 10, 3)]),
+                         [None, None])
+
+    def test_read_cached(self):
+        for __ in range(3):
+            self.assertEqual(self.i.identification.usertag.read(node=3),
+                             "USER")
+        self.assertEqual(self.i.identification.usertag.cacheInfo()[:2],
+                         (2, 1))
+
+
+class BinaryProtocolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.socket = Simulator([3, 4], protocol=BinaryProtocol)
+        self.i = Controller(self.socket, protocol=BinaryProtocol)
+
+    def test_message(self):
+        frame = unhexlify("06030101211003")
+        message = BinaryProtocol.toMessage(frame)
+        self.assertEqual(message, "\x10\x02" + unhexlify("0603010121101003")
+                         + "\x10\x03")
+        self.assertEqual(BinaryProtocol.fromMessage(message), frame)
+        self.assertEqual(BinaryProtocol.splitMessage(message + "\x10"),
+                         (message, "\x10"))
+        self.assertEqual(BinaryProtocol.splitMessage(message[:-1]),
+                         (None, message[:-1]))
+
+    def test_write_read(self):
+        self.i.setpoint.write(50, node=3)
+        self.assertEqual(self.i.setpoint.read(node=3), 50.0)
+        self.i.fluid.write("WATER", node=3)
+        self.assertEqual(self.i.fluid.read(node=3), "WATER")
+
+    def test_escaped_value(self):
+        # 0x1003 contains DLE ETX
+        self.i.setpoint.write(0x1003 / 320.0, node=3)
+        self.assertEqual(self.i.setpoint.read(node=3), 0x1003 / 320.0)
+
+    def test_parameter_error(self):
+        self.assertRaises(BronkhorstHardwareError,
+                          self.i.counter.value.read, node=3)
+
+    def test_no_answer(self):
+        self.assertRaises(BronkhorstHardwareError,
+                          self.i.setpoint.read, node=5)
+
+    def test_read_chained(self):
+        i = self.i
+        self.socket.params[3, 1, 0] = "\x0c\x80"  # 10%
+        i.setpoint.write(20, node=3)
+        self.assertEqual(i.readMany([(i.measure, 3), (i.setpoint, 3)]),
+                         [10.0, 20.0])
+
+    def test_broadcast(self):
+        i = self.i
+        i.protocol().setNodes([3, 4])
+        self.assertEqual(i.writeMany([(i.setpoint, 30, 3),
+                                      (i.setpoint, 30, 4)]), [None, None])
+        self.assertEqual(self.socket.params[4, 1, 1], "\x25\x80")
+
+    def test_write_many_missing_node(self):
+        i = self.i
+        self.socket.nodes = frozenset([3, 5])
+        requests = [(i.setpoint, 30, node) for node in (3, 4, 5)]
+        for nodes in ((), (3, 4, 5)):  # pipelined, then broadcast
+            i.protocol().setNodes(nodes)
+            first, missing, last = i.writeMany(requests)
+            self.assertIsNone(first)
+            self.assertIn("Node 4: no answer", str(missing))
+            self.assertIsNone(last)
+
+    def test_bytes_on_the_wire(self):
+        ascii_ = Simulator([3])
+        for socket, protocol in ((ascii_, AsciiProtocol),
+                                 (self.socket, BinaryProtocol)):
+            i = Controller(socket, protocol=protocol)
+            i.setpoint.write(50, node=3)
+            i.setpoint.read(node=3)
+        binary, ascii_ = drv.socketStats(self.socket), drv.socketStats(ascii_)
+        self.assertLess(binary.bytesWritten + binary.bytesRead,
+                        0.7 * (ascii_.bytesWritten + ascii_.bytesRead))
+
 
 if __name__ == "__main__":
     unittest.main()
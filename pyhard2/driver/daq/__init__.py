@@ -113,3 +113,8 @@ class Daq(drv.Subsystem):
         self.voltage.ai = Cmd(minimum=-10, maximum=10, access=Access.RO)
         self.voltage.ao = Cmd(minimum=-10, maximum=10, access=Access.WO)
 
+    def close(self):
+        """Release the tasks held by the protocols."""
+        for subsystem in (self.digitalIO, self.voltage):
+            getattr(subsystem.protocol(), "close", lambda: None)()
+
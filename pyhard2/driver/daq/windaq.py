@@ -1,6 +1,8 @@
 """pylibnidaqmx wrappers to communicate with DAQ hardware on Windows.
 
 """
+import unittest
+from collections import OrderedDict
 import numpy as np
 import logging
 logging.basicConfig()
@@ -51,47 +53,175 @@ class DioTask(DigitalOutputTask, DigitalInputTask):
         super(DioTask, self).__init__(name)
 
 
+class TaskCache(object):
+
+    """Least recently used cache of the tasks.
+
+    Creating a task and its channel costs much more than using it, so
+    that the tasks are created once per channel and configuration and
+    reused.  The least recently used task is cleared when more than
+    `maxsize` tasks are cached.
+
+    Parameters:
+        maxsize (int): The maximum number of tasks.
+
+    """
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._tasks = OrderedDict()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def get(self, key, factory):
+        """Return the task cached for `key` or the one created with
+        `factory()`."""
+        try:
+            task = self._tasks.pop(key)
+        except KeyError:
+            task = factory()
+            while len(self._tasks) >= self.maxsize:
+                self._release(self._tasks.popitem(last=False)[1])
+        self._tasks[key] = task  # most recently used last
+        return task
+
+    def clear(self):
+        """Clear every task."""
+        while self._tasks:
+            self._release(self._tasks.popitem()[1])
+
+    @staticmethod
+    def _release(task):
+        try:
+            task.clear()
+        except Exception:
+            logging.getLogger(__name__).exception("Failed to clear %r", task)
+
+
 class DioProtocol(drv.Protocol):
 
     """Protocol for Digital IO lines."""
 
+    def __init__(self, parent=None):
+        super(DioProtocol, self).__init__(parent)
+        self._tasks = TaskCache()
+
+    def close(self):
+        """Clear the tasks."""
+        self._tasks.clear()
+
+    def _task(self, context):
+        def factory():
+            task = DioTask(_task_name(context))
+            task.create_channel(_phys_channel(context), grouping="per_line")
+            return task
+        return self._tasks.get(_phys_channel(context), factory)
+
     def read(self, context):
-        task = DioTask(_task_name(context))
-        task.create_channel(_phys_channel(context), grouping="per_line")
-        raw = task.read(1)
+        raw = self._task(context).read(1)
         return raw[0].item()
 
     def write(self, context):
-        task = DioTask(_task_name(context))
-        task.create_channel(_phys_channel(context), grouping="per_line")
-        task.write(context.value)
+        self._task(context).write(context.value)
 
 
 class VoltageAioProtocol(drv.Protocol):
 
-    """Protocol for Analog Input and Analog Output lines."""
+    """Protocol for Analog Input and Analog Output lines.
 
-    def read(self, context):
-        task = AnalogInputTask(_task_name(context))
+    The input tasks are started once and read on demand.
+
+    """
+    def __init__(self, parent=None):
+        super(VoltageAioProtocol, self).__init__(parent)
+        self._tasks = TaskCache()
+
+    def close(self):
+        """Clear the tasks."""
+        self._tasks.clear()
+
+    def _task(self, context, cls):
         minimum = context.minimum if context.minimum is not None else -10
         maximum = context.maximum if context.maximum is not None else 10
-        task.create_voltage_channel(_phys_channel(context),
-                                    terminal="rse",
-                                    min_val=minimum,
-                                    max_val=maximum)
-        task.start()
-        raw = task.read(100)
-        task.stop()
+
+        def factory():
+            task = cls(_task_name(context))
+            task.create_voltage_channel(_phys_channel(context),
+                                        terminal="rse",
+                                        min_val=minimum,
+                                        max_val=maximum)
+            if cls is AnalogInputTask:
+                task.start()
+            return task
+        return self._tasks.get(
+            (cls, _phys_channel(context), minimum, maximum), factory)
+
+    def read(self, context):
+        raw = self._task(context, AnalogInputTask).read(100)
         return np.average(raw).item()
 
     def write(self, context):
-        task = AnalogOutputTask(_task_name(context))
-        minimum = context.minimum if context.minimum is not None else -10
-        maximum = context.maximum if context.maximum is not None else 10
-        task.create_voltage_channel(_phys_channel(context),
-                                    terminal="rse",
-                                    min_val=minimum,
-                                    max_val=maximum)
-        task.write(self, context.value, auto_start=False)
-        task.start()
+        self._task(context, AnalogOutputTask).write(context.value)
+
+
+class _Task(object):
+
+    """Task recording whether it was cleared."""
+
+    def __init__(self, name):
+        self.name = name
+        self.cleared = False
+
+    def clear(self):
+        self.cleared = True
+
+
+class TestTaskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = TaskCache(maxsize=2)
+        self.tasks = {}
+
+    def _get(self, key):
+        return self.cache.get(
+            key, lambda: self.tasks.setdefault(key, _Task(key)))
+
+    def test_reuse(self):
+        self.assertIs(self._get("ai0"), self._get("ai0"))
+        self.assertEqual(len(self.cache), 1)
+
+    def test_evict_least_recently_used(self):
+        self._get("ai0")
+        self._get("ai1")
+        self._get("ai0")  # ai1 is now the least recently used
+        self._get("ai2")
+        self.assertEqual(len(self.cache), 2)
+        self.assertTrue(self.tasks["ai1"].cleared)
+        self.assertFalse(self.tasks["ai0"].cleared)
+        self.assertFalse(self.tasks["ai2"].cleared)
+
+    def test_clear(self):
+        for key in ("ai0", "ai1"):
+            self._get(key)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertTrue(all(task.cleared for task in self.tasks.values()))
+        cleared = self.tasks.pop("ai0")
+        self.assertIsNot(self._get("ai0"), cleared)
+
+    def test_clear_failure(self):
+        task = self._get("ai0")
+
+        def fail():
+            raise RuntimeError("DAQmx error")
+
+        task.clear = fail
+        self._get("ai1")
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertTrue(self.tasks["ai1"].cleared)
+
+
+if __name__ == "__main__":
+    unittest.main()
 
@@ -12,7 +12,8 @@ def _str2bool(s):
     return bool(int(s))
 
 def _stripEot(msg):
-    assert(msg.endswith("\x04"))
+    if not msg.endswith("\x04"):
+        raise drv.HardwareError("Expected EOT, got %r instead." % msg)
     return msg[:-1]
 
 
@@ -54,7 +55,7 @@ class DplProtocol(drv.CommunicationProtocol):
         msg = _stripEot(self._socket.readline())
         err = self._check_error(msg)
         if err:
-            self._socket.flush()
+            self._socket.flushInput()
             raise drv.HardwareError(msg)
         return msg
 
@@ -65,11 +66,11 @@ class DplProtocol(drv.CommunicationProtocol):
 
 class ScpiCommunicationProtocol(ieee.ScpiCommunicationProtocol):
 
-    def read(self, context):
-        msg = _stripEot(super(ScpiCommunicationProtocol, self).read(context))
+    def _readline(self):
+        msg = _stripEot(super(ScpiCommunicationProtocol, self)._readline())
         err = DplProtocol._check_error(msg)
         if err:
-            self._socket.flush()
+            self._socket.flushInput()
             raise drv.HardwareError(msg)
         return msg
 
@@ -82,10 +83,15 @@ class Sm700Series(drv.Subsystem):
     subsystem as well as the SCPI-like commands found in the PSC 232 PSC
     488 Programming Manual (an html document).
 
+    Parameters:
+        readLimits (bool): Call `readLimits()` in the constructor.
+            Disable it to connect the driver to an instrument server
+            before any request is sent.
+
     .. graphviz:: gv/Sm700Series.txt
 
     """
-    def __init__(self, socket):
+    def __init__(self, socket, readLimits=True):
         super(Sm700Series, self).__init__()
         socket.timeout = 1.0
         # Termination character Controller -> PSC232: LF or CR
@@ -149,7 +155,12 @@ class Sm700Series(drv.Subsystem):
         # SP
         self.variables = Cmd("VAR", access=Access.RO)
         self.help = Cmd("HELP", access=Access.RO)
-        # set max current and voltage:
+        if readLimits:
+            self.readLimits()
+
+    def readLimits(self):
+        """Set the maximum voltage and current to those of the
+        instrument."""
         try:
             self.source.voltage.maximum = self.source.max_voltage.read()
             self.source.current.maximum = self.source.max_current.read()
@@ -174,7 +185,10 @@ class TestSm700(unittest.TestCase):
                       "SO:FU:RSD OFF\n": "",
                       "CA:CU:ME:GA?\n": "14810\r\n\x04",
                       "SO:VO:MA?\n": "70\r\n\x04",
-                      "SO:CU:MA?\n": "37\r\n\x04"
+                      "SO:CU:MA?\n": "37\r\n\x04",
+                      "ME:VO?;CU?\n": "12.5;1.2\r\n\x04",
+                      "ME:VO?;:ME:CU?\n": "ER17\r\n\x04",
+                      "SO:VO?;:SO:CU?\n": "",
                      }
         self.i = Sm700Series(socket)
 
@@ -199,6 +213,34 @@ class TestSm700(unittest.TestCase):
     def test_scpi_read_cacumega(self):
         self.assertEqual(self.i.calibration.current.measure.gain.read(), 14810)
 
+    def test_scpi_read_many_relative(self):
+        i = self.i
+        i.protocol().setRelativeHeaders(True)
+        self.assertEqual(i.readMany([(i.measure.voltage, None),
+                                     (i.measure.current, None)]),
+                         [12.5, 1.2])
+
+    def test_scpi_read_many_error(self):
+        i = self.i
+        voltage, current = i.readMany([(i.measure.voltage, None),
+                                       (i.measure.current, None)])
+        self.assertIsInstance(voltage, drv.HardwareError)
+        self.assertIs(current, voltage)
+
+    def test_scpi_read_many_timeout(self):
+        i = self.i
+        voltage, current = i.readMany([(i.source.voltage, None),
+                                       (i.source.current, None)])
+        self.assertIn("Expected EOT", str(voltage))
+        self.assertIs(current, voltage)
+
+    def test_no_request_without_limits(self):
+        socket, written = drv.TesterSocket(), []
+        socket.write = written.append
+        i = Sm700Series(socket, readLimits=False)
+        self.assertEqual(written, [])
+        self.assertIsNone(i.source.voltage.maximum)
+
     def test_scpi_UI_limit(self):
         self.assertEqual(self.i.source.voltage.maximum, self.i.source.max_voltage.read())
         self.assertEqual(self.i.source.current.maximum, self.i.source.max_current.read())
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 import pyhard2.driver as drv
 
 
@@ -34,10 +35,33 @@ class ScpiSubsystem(drv.Subsystem):
 
 class ScpiCommunicationProtocol(drv.CommunicationProtocol):
 
-    """SCPI protocol."""
+    """SCPI protocol.
 
-    def __init__(self, socket, parent=None):
+    The short form of the header of every command is computed once and
+    cached.
+
+    Parameters:
+        relativeHeaders (bool): See `setRelativeHeaders()`.
+
+    """
+    def __init__(self, socket, parent=None, relativeHeaders=False):
         super(ScpiCommunicationProtocol, self).__init__(socket, parent)
+        self._headers = {}
+        self._relativeHeaders = relativeHeaders
+
+    def relativeHeaders(self):
+        """Return True if `readMany()` sends relative headers."""
+        return self._relativeHeaders
+
+    def setRelativeHeaders(self, relative):
+        """Send the headers relative to the previous header in `readMany()`.
+
+        The queries sharing a path are grouped and sent with a
+        relative header, e.g., ``MEAS:VOLT?;CURR?`` instead of
+        ``MEAS:VOLT?;:MEAS:CURR?``.
+
+        """
+        self._relativeHeaders = relative
 
     @staticmethod
     def _scpiPath(context):
@@ -49,20 +73,115 @@ class ScpiCommunicationProtocol(drv.CommunicationProtocol):
     def _scpiStrip(path):
         return "".join((c for c in path if c.isupper() or not c.isalpha()))
 
+    def _header(self, context, mnemonic):
+        """Return the short form of the header of `mnemonic`."""
+        key = (mnemonic, tuple(context.path))
+        try:
+            return self._headers[key]
+        except KeyError:
+            header = self._headers[key] = self._scpiStrip(
+                ":".join((self._scpiPath(context), mnemonic)))
+            return header
+
+    def _readline(self):
+        """Return the answer from the instrument."""
+        return self._socket.readline()
+
     def read(self, context):
-        msg = "{path}?\n".format(
-            path=self._scpiStrip(":".join((self._scpiPath(context),
-                                           context.reader))))
+        msg = "{path}?\n".format(path=self._header(context, context.reader))
         self._socket.write(msg)
-        return self._socket.readline()
+        return self._readline()
+
+    def readMany(self, contexts):
+        """Join the queries with ``;`` into a single message and split
+        the answer.
+
+        Every context gets a `HardwareError` if reading the answer
+        raised one or if the number of answers does not match, e.g.,
+        after a timeout.
+
+        Example:
+            ``SOUR:VOLT?;:SOUR:CURR?``, or ``SOUR:VOLT?;CURR?`` with
+            relative headers.
+
+        """
+        if len(contexts) < 2:
+            return super(ScpiCommunicationProtocol, self).readMany(contexts)
+        headers = [self._header(context, context.reader).lstrip(":")
+                   for context in contexts]
+        order = range(len(contexts))
+        if self._relativeHeaders:
+            groups = OrderedDict()
+            for index, header in enumerate(headers):
+                groups.setdefault(header.rpartition(":")[0], []).append(index)
+            order = [index for group in groups.itervalues() for index in group]
+        queries, current = [], None
+        for index in order:
+            path, __, node = headers[index].rpartition(":")
+            if self._relativeHeaders and path == current:
+                queries.append(node + "?")
+            else:
+                queries.append((":" if queries else "") + headers[index] + "?")
+            current = path
+        msg = "{queries}\n".format(queries=";".join(queries))
+        self._socket.write(msg)
+        try:
+            answers = self._readline().strip().split(";")
+        except drv.HardwareError as e:
+            return [e] * len(contexts)
+        if len(answers) != len(contexts):
+            # Timeout or truncated answer: no value can be trusted.
+            error = HardwareError("Expected %i answers to %r, got %r instead."
+                                  % (len(contexts), msg, answers))
+            return [error] * len(contexts)
+        values = [None] * len(contexts)
+        for index, answer in zip(order, answers):
+            values[index] = answer
+        return values
+
+    def readBlock(self, query):
+        """Send `query` and return the IEEE 488.2 block answered.
+
+        Raises:
+            HardwareError: if the answer is not a block or is
+                incomplete.
+
+        """
+        with self.transaction():
+            self._socket.write("{query}\n".format(query=query))
+            header = self._socket.read(2)
+            if len(header) != 2 or header[0] != "#":
+                raise HardwareError("Expected a block to %r, got %r."
+                                    % (query, header))
+            if header[1] == "0":
+                # indefinite length block, ends with the newline
+                return self._socket.readline()[:-1]
+            try:
+                size = int(self._socket.read(int(header[1])))
+            except ValueError:
+                raise HardwareError("Invalid block header to %r." % query)
+            chunks, received = [], 0
+            while received < size:
+                chunk = self._socket.read(size - received)
+                if not chunk:
+                    raise HardwareError(
+                        "Block to %r incomplete, %i of %i bytes." %
+                        (query, received, size))
+                chunks.append(chunk)
+                received += len(chunk)
+            self._socket.readline()  # terminator
+            return "".join(chunks)
 
     def write(self, context):
         if context.value is True:
             context.value = "ON"
         elif context.value is False:
             context.value = "OFF"
-        msg = "{path} {value}\n".format(
-            path=self._scpiStrip(":".join((self._scpiPath(context),
-                                           context.writer))),
-            value=context.value)
+        if context.value is None:
+            # commands without parameter, e.g., `*RST`
+            msg = "{path}\n".format(path=self._header(context, context.writer))
+        else:
+            msg = "{path} {value}\n".format(
+                path=self._header(context, context.writer),
+                value=context.value)
         self._socket.write(msg)
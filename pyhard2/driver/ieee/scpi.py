@@ -37,7 +37,8 @@ class ScpiRequired(ieee.ScpiSubsystem):
         self.system = ScpiSubsystem("SYSTem", self._scpi)
         self.system.error = ScpiSubsystem("ERRor", self.system)
         self.system.error.next = Cmd("NEXT", access=Access.RO)
-        self.system.version = Cmd("VERSion", rfunc=float, access=Access.RO)
+        self.system.version = Cmd("VERSion", rfunc=float, access=Access.RO,
+                                  cache_ttl=3600.0)
         # STATus
         self.status = ScpiSubsystem("STATus", self._scpi)
         self.status.operation = ScpiSubsystem("OPERation", self.status)
@@ -164,6 +165,10 @@ class TestScpi(unittest.TestCase):
         socket.msg = {"SOUR:VOLT?\n": "1.7\n",
                       "SOUR:CURR?\n": "0.5\n",
                       "SYST:VERS?\n": "1.2345\n",
+                      "SOUR:VOLT?;:SOUR:CURR?\n": "1.7;0.5\n",
+                      "MEAS:VOLT?;CURR?;:SOUR:VOLT?;CURR?\n":
+                      "1.6;0.4;1.7;0.5\n",
+                      "SOUR:CURR?;:SOUR:VOLT?\n": "",
                       "*RST\n": "",
                      }
         self.i = ScpiPowerSupply(socket)
@@ -177,6 +182,33 @@ class TestScpi(unittest.TestCase):
     def test_required_subsystem(self):
         self.assertEqual(self.i.system.version.read(), 1.2345)
 
+    def test_read_many(self):
+        self.assertEqual(self.i.readMany([(self.i.source.voltage, None),
+                                          (self.i.source.current, None)]),
+                         [1.7, 0.5])
+
+    def test_read_many_timeout(self):
+        values = self.i.readMany([(self.i.source.current, None),
+                                  (self.i.source.voltage, None)])
+        self.assertEqual(len(values), 2)
+        for value in values:
+            self.assertIsInstance(value, drv.HardwareError)
+
+    def test_read_many_relative(self):
+        i = self.i
+        i._scpi.protocol().setRelativeHeaders(True)
+        self.assertEqual(i.readMany([(i.measure.voltage, None),
+                                     (i.source.voltage, None),
+                                     (i.measure.current, None),
+                                     (i.source.current, None)]),
+                         [1.6, 1.7, 0.4, 0.5])
+
+    def test_header_cached(self):
+        protocol = self.i._scpi.protocol()
+        for __ in range(2):
+            self.i.source.voltage.read()
+        self.assertEqual(protocol._headers.values(), ["SOUR:VOLT"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,16 @@
 """Keithley driver.
 
+Note:
+    The buffered acquisition requires `numpy`.
+
 """
 import unittest
+import struct
+import time
+try:
+    import numpy as np
+except ImportError:
+    np = None
 import pyhard2.driver as drv
 Cmd, Access = drv.Command, drv.Access
 import pyhard2.driver.ieee.scpi as scpi
@@ -11,6 +20,13 @@ class Model6487(scpi.ScpiRequired):
 
     """Driver for Keithley Model 6487 Picoammeter/Voltage Source.
 
+    Example:
+        Acquire 1000 readings in the buffer and read them at once::
+
+            i = Model6487(drv.Serial("/dev/ttyUSB0"))
+            data = i.acquire(1000)
+            data["reading"], data["time"]
+
     .. graphviz:: gv/Model6487.txt
 
     """
@@ -39,6 +55,95 @@ class Model6487(scpi.ScpiRequired):
         self.display.window.text = scpi.ScpiSubsystem("TEXT", self.display.window)
         self.display.window.data = Cmd("DATA")
         self.display.window.state = Cmd("STATe")
+        # FORMat subsystem
+        self.format = scpi.ScpiSubsystem("FORMat", self._scpi)
+        self.format.data = Cmd("DATA")
+        self.format.elements = Cmd("ELEMents")
+        self.format.byte_order = Cmd("BORDer")
+        # TRACe subsystem
+        self.trace = scpi.ScpiSubsystem("TRACe", self._scpi)
+        self.trace.clear = Cmd("CLEar", access=Access.WO)
+        self.trace.points = Cmd("POINts", rfunc=int, minimum=1, maximum=3000)
+        self.trace.actual_points = Cmd("POINts:ACTual", rfunc=int,
+                                       access=Access.RO)
+        self.trace.feed = Cmd("FEED")
+        self.trace.feed_control = Cmd("FEED:CONTrol")
+        self.trace.data = Cmd("DATA", access=Access.RO)
+        # TRIGger subsystem
+        self.trigger = scpi.ScpiSubsystem("TRIGger", self._scpi)
+        self.trigger.count = Cmd("COUNt", rfunc=int, minimum=1, maximum=2048)
+        self.trigger.delay = Cmd("DELay", rfunc=float,
+                                 minimum=0.0, maximum=999.9998)
+        # Root commands, on the subsystem with the protocol
+        self._scpi.initiate = Cmd("INITiate", access=Access.WO)
+        self._scpi.abort = Cmd("ABORt", access=Access.WO)
+        self.initiate, self.abort = self._scpi.initiate, self._scpi.abort
+
+    def startBuffer(self, count, delay=0.0, binary=True):
+        """Start storing `count` readings and their timestamps in the
+        buffer.
+
+        Parameters:
+            count (int): The number of readings.
+            delay (float): The trigger delay in seconds.
+            binary (bool): Transfer the buffer in `REAL,32` format,
+                otherwise in ASCII.  The RS-232 interface only supports
+                ASCII.
+
+        """
+        self.abort.write()
+        self.format.elements.write("READ,TIME")
+        self.format.data.write("REAL,32" if binary else "ASC")
+        self.format.byte_order.write("NORM")
+        self.trigger.count.write(count)
+        self.trigger.delay.write(delay)
+        self.trace.clear.write()
+        self.trace.points.write(count)
+        self.trace.feed.write("SENS")
+        self.trace.feed_control.write("NEXT")
+        self.initiate.write()
+
+    def readBuffer(self, binary=True):
+        """Read the whole buffer in one transfer.
+
+        Returns:
+            numpy.ndarray: Record array with the fields `reading` and
+                `time`.
+
+        Raises:
+            DriverError: if `numpy` is not installed.
+
+        """
+        if np is None:
+            raise drv.DriverError("The buffer requires `numpy`.")
+        if binary:
+            data = np.frombuffer(self._scpi.protocol().readBlock("TRAC:DATA?"),
+                                 dtype=">f4").astype(float)
+        else:
+            data = np.array(self.trace.data.read().strip().split(","),
+                            dtype=float)
+        return np.rec.fromarrays(data.reshape(-1, 2).T,
+                                 names=("reading", "time"))
+
+    def acquire(self, count, delay=0.0, binary=True, timeout=60.0):
+        """Store `count` readings in the buffer and return them.
+
+        Raises:
+            HardwareError: if the buffer is not full after `timeout`
+                seconds.
+
+        See also:
+            `startBuffer()`, `readBuffer()`
+
+        """
+        self.startBuffer(count, delay, binary)
+        start = time.time()
+        while self.trace.actual_points.read() < count:
+            if time.time() - start > timeout:
+                raise drv.HardwareError(
+                    "Buffer not full after %.1f s." % timeout)
+            time.sleep(0.01)
+        return self.readBuffer(binary)
 
 
 class Model6487Test(unittest.TestCase):
@@ -48,7 +153,19 @@ class Model6487Test(unittest.TestCase):
         socket.msg = {"CALC:STAT ON\n": "",
                       "CALC:KMAT:MMF 0.002\n": "",
                       "CALC:DATA?\n": "12",}
+        for command in (":ABOR", "FORM:ELEM READ,TIME", "FORM:DATA REAL,32",
+                        "FORM:DATA ASC", "FORM:BORD NORM", "TRIG:COUN 3",
+                        "TRIG:DEL 0.0", "TRAC:CLE", "TRAC:POIN 3",
+                        "TRAC:FEED SENS", "TRAC:FEED:CONT NEXT", ":INIT"):
+            socket.msg[command + "\n"] = ""
+        socket.msg["TRAC:POIN:ACT?\n"] = "3\r\n"
+        # 1 nA at 0 s, 2 nA at 0.5 s, 2.05 nA at 1 s, packed with "\r\n"
+        self.readings = [1e-9, 0.0, 2e-9, 0.5,
+                         struct.unpack(">f", "\x31\r\n\x00")[0], 1.0]
+        data = struct.pack(">6f", *self.readings)
+        socket.msg["TRAC:DATA?\n"] = "#224" + data + "\r\n"
         self.i = Model6487(socket)
+        self.socket = socket
 
 
     def test_read(self):
@@ -60,6 +177,23 @@ class Model6487Test(unittest.TestCase):
     def test_write_bool(self):
         self.i.calculate.state.write(True)
 
+    @unittest.skipIf(np is None, "requires numpy")
+    def test_acquire(self):
+        data = self.i.acquire(3)
+        self.assertEqual(data.shape, (3,))
+        np.testing.assert_allclose(data.reading, self.readings[::2], 1e-6)
+        np.testing.assert_allclose(data["time"], self.readings[1::2])
+
+    @unittest.skipIf(np is None, "requires numpy")
+    def test_acquire_ascii(self):
+        self.socket.msg["TRAC:DATA?\n"] = "1E-9,0,2E-9,0.5,3E-9,1\r\n"
+        data = self.i.acquire(3, binary=False)
+        np.testing.assert_allclose(data.reading, [1e-9, 2e-9, 3e-9])
+
+    def test_incomplete_block(self):
+        self.socket.msg["TRAC:DATA?\n"] = "#224" + "\0" * 8
+        self.assertRaises(drv.HardwareError, self.i.readBuffer)
+
 
 if __name__ == "__main__":
     import logging
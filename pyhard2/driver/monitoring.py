@@ -0,0 +1,235 @@
+"""Export the request statistics of a driver in Prometheus text format.
+
+The statistics are collected by the `Commands` and the sockets of the
+driver, see :class:`pyhard2.driver.Stats`.  The HTTP endpoint binds to
+the loopback interface by default::
+
+    server = monitoring.serve(driver, port=9100)
+    ...
+    server.shutdown()
+
+"""
+import unittest
+import threading
+import BaseHTTPServer
+import pyhard2.driver as drv
+
+
+QUANTILES = (50, 90, 99)
+
+
+def _escape(value):
+    """Escape `value` for use as a label value."""
+    return (str(value).replace("\\", r"\\")
+            .replace('"', r'\"').replace("\n", r"\n"))
+
+
+def _labels(**labels):
+    return "{%s}" % ",".join('%s="%s"' % (key, _escape(value))
+                             for key, value in sorted(labels.iteritems()))
+
+
+def _protocols(subsystem):
+    """Yield the `Protocols` set in the tree of `subsystem`."""
+    if subsystem.protocol():
+        yield subsystem.protocol()
+    for name, child in sorted(vars(subsystem).iteritems()):
+        if (not name.startswith("_") and isinstance(child, drv.Subsystem)
+                and child.parent() is subsystem):
+            for protocol in _protocols(child):
+                yield protocol
+
+
+def _socketName(protocol):
+    socket = getattr(protocol, "_socket", None)
+    port = getattr(socket, "port", None)
+    return port if port is not None else protocol.__class__.__name__
+
+
+def formatPrometheus(driver, name=None):
+    """Return the statistics of `driver` in Prometheus text format.
+
+    Every metric is described once; the `driver` label tells the
+    drivers apart.
+
+    Parameters:
+        driver (Subsystem or dict): The driver or a dict mapping names
+            to drivers.
+        name (str, optional): The `driver` label of a single driver,
+            default to the class name of `driver`.
+
+    """
+    if isinstance(driver, dict):
+        drivers = sorted(driver.iteritems())
+    else:
+        drivers = [(name if name is not None else driver.__class__.__name__,
+                    driver)]
+    lines = []
+
+    def metric(metric, kind, help, samples):
+        lines.append("# HELP %s %s" % (metric, help))
+        lines.append("# TYPE %s %s" % (metric, kind))
+        for labels, value in samples:
+            lines.append("%s%s %r" % (metric, _labels(**labels), value))
+
+    commands = [(dict(driver=name, command=command, node=node), stats)
+                for name, driver in drivers
+                for (command, node), stats in driver.stats().iteritems()]
+    metric("pyhard2_requests_total", "counter",
+           "Requests sent to the hardware.",
+           [(labels, stats.requests) for labels, stats in commands])
+    metric("pyhard2_hardware_errors_total", "counter",
+           "Failed requests: errors raised or reads timed out.",
+           [(labels, stats.errors) for labels, stats in commands])
+    metric("pyhard2_request_timeouts_total", "counter",
+           "Reads from the socket that timed out during the requests.",
+           [(labels, stats.timeouts) for labels, stats in commands])
+    samples = []
+    for labels, stats in commands:
+        for q in QUANTILES:
+            latency = stats.percentile(q)
+            if latency is not None:
+                samples.append((dict(labels, quantile=q / 100.0), latency))
+    # The quantiles, sum, and count of the summary all describe the
+    # successful requests; the failures are pyhard2_hardware_errors_total.
+    metric("pyhard2_request_latency_seconds", "summary",
+           "Round-trip time of the successful requests.", samples)
+    lines.extend("pyhard2_request_latency_seconds_sum%s %r" % (
+        _labels(**labels), stats.latencySum) for labels, stats in commands)
+    lines.extend("pyhard2_request_latency_seconds_count%s %r" % (
+        _labels(**labels), stats.requests - stats.errors)
+        for labels, stats in commands)
+
+    sockets = []
+    for name, driver in drivers:
+        seen = set()
+        for protocol in _protocols(driver):
+            stats = protocol.stats()
+            if id(stats) not in seen:
+                seen.add(id(stats))
+                sockets.append((dict(driver=name,
+                                     socket=_socketName(protocol)), stats))
+    metric("pyhard2_socket_requests_total", "counter",
+           "Requests handled by the socket.",
+           [(labels, stats.requests) for labels, stats in sockets])
+    metric("pyhard2_socket_read_bytes_total", "counter",
+           "Bytes read from the socket.",
+           [(labels, stats.bytesRead) for labels, stats in sockets])
+    metric("pyhard2_socket_written_bytes_total", "counter",
+           "Bytes written to the socket.",
+           [(labels, stats.bytesWritten) for labels, stats in sockets])
+    metric("pyhard2_socket_timeouts_total", "counter",
+           "Reads from the socket that timed out.",
+           [(labels, stats.timeouts) for labels, stats in sockets])
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = formatPrometheus(self.server.drivers)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(driver, port=9100, address="127.0.0.1", name=None):
+    """Serve the statistics of `driver` over HTTP in a daemon thread.
+
+    Parameters:
+        driver (Subsystem or dict): The driver or a dict mapping names
+            to drivers.
+        port (int): The TCP port, 0 picks a free port.
+        address (str): The address to bind to.
+
+    Returns:
+        BaseHTTPServer.HTTPServer: Call `shutdown()` to stop serving.
+
+    """
+    server = BaseHTTPServer.HTTPServer((address, port), _MetricsHandler)
+    server.drivers = (driver if isinstance(driver, dict) else
+                      {name if name is not None
+                       else driver.__class__.__name__: driver})
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+class TestMonitoring(unittest.TestCase):
+
+    def setUp(self):
+        class Protocol(drv.CommunicationProtocol):
+
+            def read(self, context):
+                self._socket.write("%s?\n" % context.reader)
+                return float(self._socket.readline())
+
+        socket = drv.TesterSocket()
+        socket.port = "COM1"
+        socket.msg = {"VOLT?\n": "1.5\n"}
+        self.driver = drv.Subsystem()
+        self.driver.setProtocol(Protocol(socket))
+        self.driver.voltage = drv.Command("VOLT")
+
+    def test_format(self):
+        self.assertEqual(self.driver.voltage.read(), 1.5)
+        text = formatPrometheus(self.driver, "psu")
+        self.assertIn('pyhard2_requests_total'
+                      '{command="voltage",driver="psu",node="None"} 1', text)
+        self.assertIn('pyhard2_socket_written_bytes_total'
+                      '{driver="psu",socket="COM1"} 6', text)
+        self.assertIn('pyhard2_socket_read_bytes_total'
+                      '{driver="psu",socket="COM1"} 4', text)
+
+    def test_summary_successful_requests(self):
+        self.driver.voltage.read()
+        stats = self.driver.voltage.stats()[None]
+        stats.record(5.0, error=True)
+        text = formatPrometheus(self.driver, "psu")
+        labels = '{command="voltage",driver="psu",node="None"}'
+        self.assertIn("pyhard2_request_latency_seconds_count%s 1" % labels,
+                      text)
+        self.assertIn("pyhard2_request_latency_seconds_sum%s %r" % (
+            labels, stats.percentile(100)), text)
+        self.assertIn("pyhard2_hardware_errors_total%s 1" % labels, text)
+
+    def test_format_many(self):
+        self.driver.voltage.read()
+        other = drv.Subsystem()
+        other.setProtocol(self.driver.protocol())
+        other.current = drv.Command("CURR")
+        text = formatPrometheus(dict(psu=self.driver, other=other))
+        for metric in ("pyhard2_requests_total",
+                       "pyhard2_request_latency_seconds",
+                       "pyhard2_socket_requests_total"):
+            self.assertEqual(text.count("# HELP %s " % metric), 1)
+            self.assertEqual(text.count("# TYPE %s " % metric), 1)
+        self.assertIn('pyhard2_socket_requests_total'
+                      '{driver="other",socket="COM1"} 1', text)
+        self.assertIn('pyhard2_socket_requests_total'
+                      '{driver="psu",socket="COM1"} 1', text)
+
+    def test_serve(self):
+        import urllib2
+        self.driver.voltage.read()
+        server = serve(self.driver, port=0, name="psu")
+        try:
+            text = urllib2.urlopen("http://127.0.0.1:%i/metrics"
+                                   % server.server_address[1]).read()
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(text, formatPrometheus(self.driver, "psu"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,9 @@
 import unittest
 import logging
 logging.basicConfig()
+import threading
+import time
+from contextlib import contextmanager
 import ascii
 
 import pyhard2.driver as drv
@@ -36,6 +39,19 @@ def _parse_pressure(msg):
         return float(value)
 
 
+def _parse_pressures(msg):
+    """Parser for measurement:PRX.
+
+    Returns:
+        list: `(status, pressure)` of the six gauges.
+
+    """
+    # ans fmt: "x,x.xxxEsx,x,x.xxxEsx,..."
+    fields = msg.split(",")
+    return [(int(status), float(value))
+            for status, value in zip(fields[::2], fields[1::2])]
+
+
 def _parse_error(ans):
 
     """Parser for errors."""
@@ -85,17 +101,132 @@ class CommunicationProtocol(drv.CommunicationProtocol):
         User    <-- Instrument: ACK
         User    ->  Instrument: ENQ
         User    <-- Instrument: {answer}
+
+    In streaming mode, the controller pushes the pressures of every
+    gauge continuously after ``COM``; a thread reads them into a table
+    and the pressures are read from the table.  The other commands
+    stop the streaming and start it again afterwards.  A pressure older
+    than `staleIntervals` stream intervals is an error.
     
     """
     def __init__(self, socket):
         super(CommunicationProtocol, self).__init__(socket)
         self._socket.timeout = 5.0
         self._socket.newline = "\r\n"
-
-    def read(self, context):
-        line = "{reader}{node}\r\n".format(reader=context.reader,
-                                           node=context.node
-                                           if context.node is not None else "")
+        self._stream = None
+        self._streamInterval = None
+        self._streamed = {}
+        self._received = threading.Event()
+        self._stopStream = threading.Event()
+
+    def isStreaming(self):
+        """Return True in streaming mode."""
+        return self._stream is not None
+
+    def startStreaming(self, interval=1):
+        """Let the controller push the pressures continuously.
+
+        Parameters:
+            interval (int): {0, 1, 2} for 100 ms, 1 s, or 1 min.
+
+        """
+        with self.transaction():
+            self._startStreaming(interval)
+
+    def stopStreaming(self):
+        """Stop the streaming mode."""
+        with self.transaction():
+            self._stopStreaming()
+
+    def streamedValues(self):
+        """Return the table of the values streamed.
+
+        Returns:
+            dict: Map the gauges to the `(timestamp, answer)` received
+                last, where `answer` is formatted as the answer to
+                ``PRx``.
+
+        """
+        return dict(self._streamed)
+
+    def _startStreaming(self, interval):
+        if self._stream is not None:
+            return
+        line = "COM,%i\r\n" % interval
+        self._socket.write(line)
+        self._check_error(line, self._socket.readline())
+        self._streamed.clear()
+        self._received.clear()
+        self._stopStream.clear()
+        self._socket.write("%c\r\n" % ascii.ENQ)
+        self._streamInterval = interval
+        self._stream = threading.Thread(target=self._readStream)
+        self._stream.daemon = True
+        self._stream.start()
+
+    def _stopStreaming(self):
+        if self._stream is None:
+            return
+        self._stopStream.set()
+        self._socket.write(chr(ascii.ETX))  # any input ends the stream
+        self._stream.join()
+        self._stream = None
+        getattr(self._socket, "flushInput", lambda: None)()
+
+    def _readStream(self):
+        line = ""
+        while not self._stopStream.is_set():
+            # Only read the bytes waiting so that the reads never time
+            # out and the timeouts of the socket remain those of the
+            # requests.
+            waiting = self._socket.inWaiting()
+            if not waiting:
+                self._stopStream.wait(0.01)
+                continue
+            lines = (line + self._socket.read(waiting)).split(
+                self._socket.newline)
+            line = lines.pop()  # incomplete
+            for fields in (message.strip().split(",") for message in lines):
+                if len(fields) != 2 * len(self.gauges):
+                    continue
+                timestamp = time.time()
+                for gauge in self.gauges:
+                    channel = 2 * (gauge - 1)
+                    self._streamed[gauge] = (
+                        timestamp, ",".join(fields[channel:channel + 2]))
+                self._received.set()
+
+    def _streamedValue(self, gauge):
+        if not self._received.wait(self._socket.timeout):
+            raise PfeifferHardwareError("No pressure streamed.")
+        timestamp, value = self._streamed[gauge]
+        age = time.time() - timestamp
+        if age > self.staleIntervals * self._streamPeriods[
+                self._streamInterval]:
+            raise PfeifferHardwareError(
+                "Pressure streamed %.1f s ago, the stream stalled." % age)
+        return value
+
+    def _isStreamed(self, context):
+        return (self._stream is not None and context.reader == "PR" and
+                context.node in self.gauges)
+
+    @contextmanager
+    def _pausedStreaming(self):
+        """Free the line for the other commands."""
+        interval = self._streamInterval if self._stream else None
+        self._stopStreaming()
+        try:
+            yield
+        finally:
+            if interval is not None:
+                self._startStreaming(interval)
+
+    gauges = range(1, 7)
+    staleIntervals = 3
+    _streamPeriods = (0.1, 1.0, 60.0)  # seconds, by interval
+
+    def _query(self, line):
         self._socket.write(line)        # master: "MNEMONIC <CR><LF>
         ack = self._socket.readline()   # remote: "ACK<CR><LF>"
         self._check_error(line, ack)
@@ -103,15 +234,72 @@ class CommunicationProtocol(drv.CommunicationProtocol):
         ans = self._socket.readline()   # remote: "VALUE <CR><LF>"
         return ans.strip()
 
+    def read(self, context):
+        if self._isStreamed(context):
+            return self._streamedValue(context.node)
+        with self._pausedStreaming():
+            return self._query("{reader}{node}\r\n".format(
+                reader=context.reader,
+                node=context.node if context.node is not None else ""))
+
+    def readMany(self, contexts):
+        """Read the pressure of every gauge with a single ``PRX``.
+
+        The answer for every gauge is formatted as the answer to
+        ``PRx`` so that the `rfunc` of the `Command` applies.
+
+        """
+        if self._stream is not None:
+            values = []
+            for context in contexts:
+                try:
+                    values.append(self._streamedValue(context.node)
+                                  if self._isStreamed(context) else None)
+                except drv.HardwareError as e:
+                    values.append(e)
+            others = [index for index, context in enumerate(contexts)
+                      if not self._isStreamed(context)]
+            if others:
+                with self._pausedStreaming():
+                    for index, value in zip(others, self.readMany(
+                            [contexts[index] for index in others])):
+                        values[index] = value
+            return values
+        gauges = [index for index, context in enumerate(contexts)
+                  if context.reader == "PR" and context.node in self.gauges]
+        if len(gauges) < 2:
+            return super(CommunicationProtocol, self).readMany(contexts)
+        values = [None] * len(contexts)
+        others = [index for index in range(len(contexts))
+                  if index not in gauges]
+        for index, value in zip(others, super(
+                CommunicationProtocol, self).readMany(
+                    [contexts[index] for index in others])):
+            values[index] = value
+        try:
+            fields = self._query("PRX\r\n").split(",")
+            if len(fields) != 2 * len(self.gauges):
+                raise PfeifferHardwareError(
+                    "Command PRX returned %r." % ",".join(fields))
+        except drv.HardwareError as e:
+            for index in gauges:
+                values[index] = e
+        else:
+            for index in gauges:
+                channel = 2 * (contexts[index].node - 1)
+                values[index] = ",".join(fields[channel:channel + 2])
+        return values
+
     def write(self, context):
         line = "{writer}{node} {value}\r\n".format(writer=context.writer,
                                                    node=context.node
                                                    if context.node is not None
                                                    else "",
                                                    value=context.value)
-        self._socket.write(line)        # master: "MNEMONIC VAL <CR><LF>"
-        ack = self.socket.readline()    # remote: "ACK<CR><LF>"
-        self._check_error(line, ack)
+        with self._pausedStreaming():
+            self._socket.write(line)        # master: "MNEMONIC VAL <CR><LF>"
+            ack = self._socket.readline()   # remote: "ACK<CR><LF>"
+            self._check_error(line, ack)
 
     @staticmethod
     def _check_error(line, ack):
@@ -127,6 +315,14 @@ class Maxigauge(drv.Subsystem):
 
     """Maxigauge subsystem.
 
+    Example:
+        Read the pressures from the values pushed every 100 ms::
+
+            i = Maxigauge(drv.Serial("/dev/ttyUSB0"))
+            i.startStreaming(0)
+            i.gauge.pressure.read(1)  # no traffic on the line
+            i.stopStreaming()
+
     .. graphviz:: gv/Maxigauge.txt
 
     """
@@ -164,15 +360,32 @@ class Maxigauge(drv.Subsystem):
         # SCx
         # PRx
         self.gauge.pressure = Cmd("PR", access=Access.RO, rfunc=_parse_pressure)
+        self.gauge.pressures = Cmd("PRX", access=Access.RO,
+                                   rfunc=_parse_pressures)
         # DCD
         # CID
 
+    def startStreaming(self, interval=1):
+        """Read the pressures from the values pushed by the controller.
+
+        See also:
+            `CommunicationProtocol.startStreaming()`
+
+        """
+        self.protocol().startStreaming(interval)
+
+    def stopStreaming(self):
+        """Stop the streaming mode."""
+        self.protocol().stopStreaming()
+
 
 class TestMaxigauge(unittest.TestCase):
 
     def setUp(self):
         socket = drv.TesterSocket()
         socket.msg = {"PR1\r\n": "\x06\r\n0,1.234E-2\r\n",
+                      "PRX\r\n": "\x06\r\n0,1.234E-2,0,1.000E+0,2,0.000E+0,"
+                                   "5,0.000E+0,5,0.000E+0,5,0.000E+0\r\n",
                       "UNI\r\n": "\x06\r\n0\r\n",
                       "\x05\r\n": ""}
         self.i = Maxigauge(socket)
@@ -183,6 +396,154 @@ class TestMaxigauge(unittest.TestCase):
     def test_read_controller(self):
         self.assertEqual(self.i.unit.read(), "mbar")
 
+    def test_read_all_gauges(self):
+        self.assertEqual(self.i.gauge.pressures.read(),
+                         [(0, 0.01234), (0, 1.0), (2, 0.0),
+                          (5, 0.0), (5, 0.0), (5, 0.0)])
+
+    def test_read_many(self):
+        i = self.i
+        values = i.readMany([(i.gauge.pressure, node) for node in (1, 2, 3)]
+                            + [(i.unit, None)])
+        self.assertEqual(values[:2], [0.01234, 1.0])
+        self.assertIsInstance(values[2], PfeifferHardwareError)
+        self.assertEqual(values[3], "mbar")
+        self.assertEqual(drv.socketStats(i.protocol()._socket).bytesWritten,
+                         len("PRX\r\n\x05\r\nUNI\r\n\x05\r\n"))
+
+
+class _StreamingSocket(object):
+
+    """Socket pushing `line` every `period` seconds after ``COM`` until
+    it receives ETX."""
+
+    def __init__(self, line, msg):
+        self.line = line
+        self.period = 0.001
+        self.msg = msg
+        self.timeout = 1.0
+        self.newline = "\r\n"
+        self.written = []
+        self._buffer = ""
+        self._received = threading.Condition()
+        self._streaming = threading.Event()
+        self._command = None
+
+    def _put(self, data):
+        with self._received:
+            self._buffer += data
+            self._received.notify()
+
+    def write(self, message):
+        self.written.append(message)
+        if message.startswith("COM"):
+            self._command = message
+            self._put("\x06\r\n")
+        elif message == "\x05\r\n" and self._command.startswith("COM"):
+            self._streaming.set()
+            self._pusher = threading.Thread(target=self._push)
+            self._pusher.daemon = True
+            self._pusher.start()
+        elif message == "\x03":
+            self._streaming.clear()
+            self._pusher.join()
+        elif message == "\x05\r\n":
+            self._put(self.msg[self._command][1])
+        else:
+            self._command = message
+            self._put(self.msg[message][0])
+
+    def _push(self):
+        while self._streaming.is_set():
+            self._put(self.line)
+            time.sleep(self.period)
+
+    def inWaiting(self):
+        return len(self._buffer)
+
+    def read(self, size=1):
+        with self._received:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        drv.socketStats(self).recordRead(len(data), timeout=len(data) < size)
+        return data
+
+    def readline(self):
+        deadline = time.time() + self.timeout
+        with self._received:
+            while (self.newline not in self._buffer and
+                   time.time() < deadline):
+                self._received.wait(deadline - time.time())
+            end = self._buffer.find(self.newline)
+            end = len(self._buffer) if end == -1 else end + len(self.newline)
+            line, self._buffer = self._buffer[:end], self._buffer[end:]
+        drv.socketStats(self).recordRead(
+            len(line), timeout=not line.endswith(self.newline))
+        return line
+
+    def flushInput(self):
+        with self._received:
+            self._buffer = ""
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.socket = _StreamingSocket(
+            "0,1.234E-2,0,1.000E+0,2,0.000E+0,"
+            "5,0.000E+0,5,0.000E+0,5,0.000E+0\r\n",
+            {"UNI\r\n": ("\x06\r\n", "0\r\n"),
+             "UNI 1\r\n": ("\x06\r\n", None)})
+        self.i = Maxigauge(self.socket)
+        self.i.startStreaming(0)
+
+    def tearDown(self):
+        self.i.stopStreaming()
+
+    def test_read(self):
+        self.assertEqual(self.i.gauge.pressure.read(node=2), 1.0)
+        self.assertRaises(PfeifferHardwareError,
+                          self.i.gauge.pressure.read, 3)
+        self.assertEqual(self.socket.written, ["COM,0\r\n", "\x05\r\n"])
+        self.assertEqual(sorted(self.i.protocol().streamedValues()),
+                         range(1, 7))
+
+    def test_stale(self):
+        self.assertEqual(self.i.gauge.pressure.read(node=2), 1.0)
+        self.socket.write("\x03")  # the controller stops pushing
+        time.sleep(0.4)
+        self.assertRaises(PfeifferHardwareError,
+                          self.i.gauge.pressure.read, 2)
+        value, = self.i.readMany([(self.i.gauge.pressure, 1)])
+        self.assertIsInstance(value, PfeifferHardwareError)
+
+    def test_no_timeouts_recorded(self):
+        self.socket.period = 0.15  # slower than the reads of the stream
+        for __ in range(5):
+            self.assertEqual(self.i.gauge.pressure.read(node=1), 0.01234)
+            time.sleep(0.1)
+        self.assertEqual(drv.socketStats(self.socket).timeouts, 0)
+        stats = self.i.gauge.pressure.stats()[1]
+        self.assertEqual((stats.requests, stats.errors), (5, 0))
+
+    def test_read_many(self):
+        i = self.i
+        self.assertEqual(i.readMany([(i.gauge.pressure, 1), (i.unit, None),
+                                     (i.gauge.pressure, 2)]),
+                         [0.01234, "mbar", 1.0])
+        self.assertTrue(i.protocol().isStreaming())
+
+    def test_restart_on_write(self):
+        self.i.unit._writeRaw(1)
+        self.assertEqual(self.socket.written,
+                         ["COM,0\r\n", "\x05\r\n", "\x03", "UNI 1\r\n",
+                          "COM,0\r\n", "\x05\r\n"])
+        self.assertEqual(self.i.gauge.pressure.read(node=1), 0.01234)
+
+    def test_stop(self):
+        self.i.stopStreaming()
+        self.assertFalse(self.i.protocol().isStreaming())
+        self.assertEqual(self.i.unit.read(), "mbar")
+
 
 if __name__ == "__main__":
     logger = logging.getLogger(__name__)
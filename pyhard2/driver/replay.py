@@ -0,0 +1,376 @@
+"""Record the traffic on a socket and replay it without the hardware.
+
+`RecordingSocket` wraps a socket, usually :class:`pyhard2.driver.Serial`,
+and appends every `write()`, `read()`, `readinto()`, `readline()`,
+`inWaiting()` and `flushInput()` to a file.
+`ReplaySocket` serves the recording back to the same protocol, either
+as fast as possible or with the original timing, so that the protocols
+may be benchmarked and tested against captured traffic::
+
+    socket = RecordingSocket(drv.Serial("/dev/ttyUSB0"), "maxigauge.rec")
+    Maxigauge(socket).gauge.pressure.read(1)
+    socket.close()
+
+    Maxigauge(ReplaySocket("maxigauge.rec")).gauge.pressure.read(1)
+
+The file starts with the 5 bytes `MAGIC`, followed by one record per
+call::
+
+    op (1 byte) | time (8 bytes, double) | size (4 bytes) | data
+
+where `op` is one of `WRITE`, `READ`, `READLINE`, `INWAITING`, or
+`FLUSH` and `time` is the time in seconds since the recording started.
+`readinto()` is recorded as a `READ`, the data of `INWAITING` is the
+number of bytes waiting in decimal.  Numbers are little endian.
+
+"""
+import unittest
+import struct
+import time
+from StringIO import StringIO
+import pyhard2.driver as drv
+
+
+MAGIC = "PH2R\x01"
+WRITE, READ, READLINE, INWAITING, FLUSH = "W", "R", "L", "I", "F"
+_header = struct.Struct("<cdI")
+
+
+class ReplayError(drv.DriverError):
+
+    """The requests differ from the recording."""
+
+
+def _open(file, mode):
+    return open(file, mode) if isinstance(file, basestring) else file
+
+
+def iterRecords(file):
+    """Yield the records in `file` as `(op, time, data)` tuples.
+
+    Raises:
+        ReplayError: if `file` is not a recording.
+
+    """
+    file = _open(file, "rb")
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ReplayError("%r is not a recording." % file)
+    while True:
+        header = file.read(_header.size)
+        if len(header) < _header.size:
+            return
+        op, timestamp, size = _header.unpack(header)
+        yield op, timestamp, file.read(size)
+
+
+class RecordingSocket(object):
+
+    """Wrap `socket` and record the traffic in `file`.
+
+    The other attributes, such as `timeout` or `newline`, are forwarded
+    to `socket`.
+
+    Parameters:
+        socket: The socket to record.
+        file (str or file): The file name or a file open for writing in
+            binary mode.
+
+    """
+    def __init__(self, socket, file):
+        self.__dict__.update(socket=socket, _file=_open(file, "wb"),
+                             _start=time.time())
+        self._file.write(MAGIC)
+
+    def __getattr__(self, name):
+        return getattr(self.socket, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.socket, name, value)
+
+    def _record(self, op, data):
+        self._file.write(_header.pack(op, time.time() - self._start,
+                                      len(data)))
+        self._file.write(data)
+
+    def write(self, message):
+        """Write and record `message`."""
+        self._record(WRITE, message)
+        return self.socket.write(message)
+
+    def read(self, n=1):
+        """Read and record `n` characters."""
+        data = self.socket.read(n)
+        self._record(READ, data)
+        return data
+
+    def readinto(self, b):
+        """Read into the writable buffer `b` and record the bytes read."""
+        try:
+            readinto = self.socket.readinto
+        except AttributeError:
+            data = self.socket.read(len(b))
+            n = len(data)
+            b[:n] = data
+        else:
+            n = readinto(b)
+            data = bytes(b[:n])
+        self._record(READ, data)
+        return n
+
+    def readline(self):
+        """Read and record one line."""
+        line = self.socket.readline()
+        self._record(READLINE, line)
+        return line
+
+    def inWaiting(self):
+        """Return and record the number of bytes waiting."""
+        n = int(self.socket.inWaiting())
+        self._record(INWAITING, str(n))
+        return n
+
+    def flushInput(self):
+        """Record and drop the bytes waiting."""
+        self._record(FLUSH, "")
+        return self.socket.flushInput()
+
+    def flush(self):
+        """Flush the recording to the file."""
+        self._file.flush()
+
+    def close(self):
+        """Close the recording and the socket."""
+        self._file.close()
+        getattr(self.socket, "close", lambda: None)()
+
+
+class ReplaySocket(object):
+
+    """Serve a recording made with `RecordingSocket`.
+
+    Parameters:
+        file (str or file): The recording.
+        realtime (bool): Reproduce the original timing if True;
+            otherwise answer immediately.
+        strict (bool): Raise `ReplayError` if a message written differs
+            from the recording.
+
+    Attributes:
+        timeout, newline: Set by the protocols, ignored.
+
+    """
+    def __init__(self, file, realtime=False, strict=True):
+        self._records = list(iterRecords(file))
+        self._index = 0
+        self._start = None
+        self.realtime = realtime
+        self.strict = strict
+        self.timeout = None
+        self.newline = "\n"
+
+    def _peek(self):
+        """Return the op of the next record, or None at the end."""
+        try:
+            return self._records[self._index][0]
+        except IndexError:
+            return None
+
+    def _next(self, op):
+        try:
+            record = self._records[self._index]
+        except IndexError:
+            raise ReplayError("End of the recording.")
+        if record[0] != op:
+            raise ReplayError("Expected %r but %r is recorded." % (
+                op, record[0]))
+        self._index += 1
+        if self.realtime:
+            if self._start is None:
+                self._start = time.time() - record[1]
+            delay = self._start + record[1] - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        return record[2]
+
+    def rewind(self):
+        """Start replaying from the beginning."""
+        self._index = 0
+        self._start = None
+
+    def atEnd(self):
+        """Return True if the recording has been replayed completely."""
+        return self._index == len(self._records)
+
+    def write(self, message):
+        """Check `message` against the recording."""
+        recorded = self._next(WRITE)
+        if self.strict and message != recorded:
+            raise ReplayError("Wrote %r but %r is recorded." % (
+                message, recorded))
+        drv.socketStats(self).recordWrite(len(message))
+
+    def read(self, n=1):
+        """Return the next recorded `read()`."""
+        data = self._next(READ)
+        drv.socketStats(self).recordRead(len(data), timeout=len(data) < n)
+        return data
+
+    def readinto(self, b):
+        """Copy the next recorded `read()` into the writable buffer `b`.
+
+        Returns:
+            int: The number of bytes copied.
+
+        """
+        data = self._next(READ)
+        n = min(len(b), len(data))
+        b[:n] = data[:n]
+        drv.socketStats(self).recordRead(n, timeout=n < len(b))
+        return n
+
+    def readline(self):
+        """Return the next recorded `readline()`."""
+        line = self._next(READLINE)
+        drv.socketStats(self).recordRead(len(line), timeout=not line)
+        return line
+
+    def inWaiting(self):
+        """Return the recorded `inWaiting()`.
+
+        Recordings without `INWAITING` get the size of the next
+        recorded read, if any.
+
+        """
+        op = self._peek()
+        if op == INWAITING:
+            return int(self._next(INWAITING))
+        if op in (READ, READLINE):
+            return len(self._records[self._index][2])
+        return 0
+
+    def flushInput(self):
+        """Skip the recorded `flushInput()`, if any."""
+        if self._peek() == FLUSH:
+            self._next(FLUSH)
+
+
+def _roundTrip(test, socket, driver, operation):
+    """Record `operation` on `driver(socket)` and replay it.
+
+    Check that the values and the traffic are identical.
+
+    """
+    file = StringIO()
+    file.close = lambda: None
+    recording = RecordingSocket(socket, file)
+    values = operation(driver(recording))
+    recording.close()
+    file.seek(0)
+    replay = ReplaySocket(file)
+    test.assertEqual(operation(driver(replay)), values)
+    test.assertTrue(replay.atEnd())
+    return values, list(iterRecords(StringIO(file.getvalue())))
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        from pyhard2.driver.pfeiffer import Maxigauge
+        self.Maxigauge = Maxigauge
+        socket = drv.TesterSocket()
+        socket.msg = {"PR1\r\n": "\x06\r\n0,1.234E-2\r\n",
+                      "UNI\r\n": "\x06\r\n0\r\n",
+                      "\x05\r\n": ""}
+        self.file = StringIO()
+        self.file.close = lambda: None
+        self.recording = RecordingSocket(socket, self.file)
+        i = Maxigauge(self.recording)
+        self.values = [i.gauge.pressure.read(node=1), i.unit.read()]
+        self.recording.close()
+        self.file.seek(0)
+
+    def test_records(self):
+        self.assertEqual([(op, data) for op, __, data
+                          in iterRecords(self.file)],
+                         [(WRITE, "PR1\r\n"), (READLINE, "\x06\r\n"),
+                          (WRITE, "\x05\r\n"), (READLINE, "0,1.234E-2\r\n"),
+                          (WRITE, "UNI\r\n"), (READLINE, "\x06\r\n"),
+                          (WRITE, "\x05\r\n"), (READLINE, "0\r\n")])
+
+    def test_replay(self):
+        socket = ReplaySocket(self.file)
+        i = self.Maxigauge(socket)
+        self.assertEqual([i.gauge.pressure.read(node=1), i.unit.read()],
+                         self.values)
+        self.assertTrue(socket.atEnd())
+
+    def test_replay_differs(self):
+        i = self.Maxigauge(ReplaySocket(self.file))
+        self.assertRaises(ReplayError, i.gauge.pressure.read, node=2)
+
+    def test_forward_attributes(self):
+        self.assertEqual(self.recording.newline, "\r\n")
+
+    def test_readinto_inwaiting_flush(self):
+        socket = drv.TesterSocket()
+        socket.msg = {"DATA?\r\n": "0123456789\r\n"}
+
+        def operation(socket):
+            socket.write("DATA?\r\n")
+            waiting = socket.inWaiting()
+            b = bytearray(4)
+            n = socket.readinto(memoryview(b))
+            socket.flushInput()
+            return waiting, n, bytes(b)
+
+        values, records = _roundTrip(self, socket, lambda socket: socket,
+                                     operation)
+        self.assertEqual(values, (1, 4, "0123"))
+        self.assertEqual([(op, data) for op, __, data in records],
+                         [(WRITE, "DATA?\r\n"), (INWAITING, "1"),
+                          (READ, "0123"), (FLUSH, "")])
+
+    def test_bronkhorst(self):
+        from pyhard2.driver.bronkhorst import Controller, Simulator
+        socket = Simulator([3])
+        socket.params[3, 1, 0] = "\x3e\x80"
+        socket.params[3, 1, 1] = "\x3e\x80"
+
+        def operation(i):
+            i.setpoint.write(50, node=3)
+            return i.readMany([(i.setpoint, 3), (i.measure, 3)])
+
+        values, __ = _roundTrip(self, socket, Controller, operation)
+        self.assertEqual(values, [50.0, 50.0])
+
+    def test_watlow(self):
+        from pyhard2.driver.watlow import Series988
+        socket = drv.TesterSocket()
+        socket.msg = {"? SP1\r": "\x13\x1125\r",
+                      "? ER2\r": "\x13\x110\r",
+                      "= SP1 32\r": "\x13\x11"}
+
+        def operation(i):
+            i.setpoint.write(32)
+            return i.setpoint.read()
+
+        values, __ = _roundTrip(self, socket, Series988, operation)
+        self.assertEqual(values, 25)
+
+    def test_amtron(self):
+        from pyhard2.driver.amtron import CS400
+        socket = drv.TesterSocket()
+        socket.msg = {":r 007\r": ":r 007\r\n:1234\r\n:OK   \r\n",
+                      ":w 60B 5\r": ":w 60B 5\r\n:OK   \r\n"}
+
+        def operation(i):
+            i.interface.pilot_beam_intensity.write(5)
+            return i.firmware.read()
+
+        values, records = _roundTrip(self, socket, CS400, operation)
+        self.assertEqual(values, 1.234)
+        self.assertIn(INWAITING, [op for op, __, __ in records])
+
+
+if __name__ == "__main__":
+    unittest.main()
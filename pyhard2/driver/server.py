@@ -0,0 +1,442 @@
+"""Share instruments between processes with an instrument server.
+
+The `InstrumentServer` owns the driver trees and their ports and serves
+the `Commands` over a local TCP socket so that several GUIs, loggers
+and scripts share the hardware instead of competing for the port.  The
+requests from all the clients are serialized by the `transaction()`
+lock of each port; identical reads waiting at the same time are sent
+to the hardware only once and the answer goes to every client.
+
+Start a server owning a Bronkhorst MFC on COM4 with::
+
+    python -m pyhard2.driver.server --address localhost:7000 \\
+        COM4=pyhard2.driver.bronkhorst:MFC
+
+The clients build the same driver and replace its communication
+protocols with `ClientProtocol`, see `connectToServer()`.  The values
+exchanged are the raw values of the protocol so that `rfunc` and `wfunc`
+run in the client.
+
+The requests and answers are JSON objects, one per line::
+
+    {"id": 1, "op": "read", "driver": "COM4",
+     "command": "direct_reading.measure", "node": 3}
+    {"id": 1, "value": 16000}
+    {"id": 2, "error": "...", "type": "HardwareError"}
+
+"""
+import unittest
+import argparse
+import json
+import logging
+import threading
+import time
+import SocketServer
+from collections import OrderedDict, deque
+from importlib import import_module
+import pyhard2.driver as drv
+from pyhard2.driver import tcp
+
+
+def commandNames(driver):
+    """Return an `OrderedDict` mapping the `Commands` of `driver` to
+    their dotted path from `driver`.
+
+    The public attributes are walked breadth first from `driver` so
+    that every `Command` gets its shortest path, also when its parent
+    is private, like the `_scpi` `Subsystem` of the SCPI drivers.
+
+    """
+    names = OrderedDict()
+    queue, seen = deque([("", driver)]), set([id(driver)])
+    while queue:
+        prefix, subsystem = queue.popleft()
+        for attr, child in sorted(vars(subsystem).iteritems()):
+            if attr.startswith("_"):
+                continue
+            if isinstance(child, drv.Command):
+                names.setdefault(child, prefix + attr)
+            elif isinstance(child, drv.Subsystem) and id(child) not in seen:
+                seen.add(id(child))
+                queue.append((prefix + attr + ".", child))
+    return names
+
+
+def commandName(driver, command):
+    """Return the dotted path to `command` from `driver`.
+
+    Raises:
+        DriverError: if `command` is not an attribute in the tree of
+            `driver`.
+
+    """
+    try:
+        return commandNames(driver)[command]
+    except KeyError:
+        raise drv.DriverError("%r is not in %r." % (command, driver))
+
+
+def findCommand(driver, name):
+    """Return the `Command` at the dotted path `name` in `driver`.
+
+    Raises:
+        DriverError: if there is no `Command` at `name`.
+
+    """
+    node = driver
+    for attr in name.split("."):
+        node = (getattr(node, attr, None)
+                if not attr.startswith("_") and isinstance(node, drv.Subsystem)
+                else None)
+    if not isinstance(node, drv.Command):
+        raise drv.DriverError("No command %s." % name)
+    return node
+
+
+class _PendingRead(object):
+
+    """A read shared by the clients waiting for the same value."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = self.error = None
+        self.waiters = 0
+
+
+class InstrumentServer(SocketServer.ThreadingTCPServer):
+
+    """Serve the `Commands` of `drivers` over TCP.
+
+    Parameters:
+        drivers (dict): Map names to the drivers.
+        address (tuple): `(host, port)` to bind to, the port 0 picks a
+            free port.
+
+    Methods:
+        serve_forever(): Handle the requests until `shutdown()`.
+
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, drivers, address=("127.0.0.1", 0)):
+        SocketServer.ThreadingTCPServer.__init__(self, address, _Handler)
+        self.drivers = drivers
+        self._pending = {}
+        self._pendingLock = threading.Lock()
+        self._commands = {}
+
+    def command(self, driver, name):
+        """Return the `Command` `name` of the driver `driver`."""
+        try:
+            return self._commands[driver, name]
+        except KeyError:
+            try:
+                tree = self.drivers[driver]
+            except KeyError:
+                raise drv.DriverError("No driver %s." % driver)
+            command = self._commands[driver, name] = findCommand(tree, name)
+            return command
+
+    def read(self, driver, name, node=None):
+        """Return the raw value of the `Command`.
+
+        Identical reads requested while one is executing wait for its
+        answer instead of being sent to the hardware.
+
+        """
+        command = self.command(driver, name)
+        key = (driver, name, json.dumps(node))
+        with self._pendingLock:
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = _PendingRead()
+            else:
+                pending.waiters += 1
+        if owner:
+            try:
+                pending.value = command._readRaw(node)
+            except Exception as e:
+                pending.error = e
+            finally:
+                with self._pendingLock:
+                    del self._pending[key]
+                pending.done.set()
+        else:
+            pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.value
+
+    def write(self, driver, name, value, node=None):
+        """Write the raw `value` to the `Command`."""
+        self.command(driver, name)._writeRaw(value, node)
+
+    def handle(self, request):
+        """Return the answer to `request`."""
+        answer = dict(id=request.get("id"))
+        try:
+            op = request["op"]
+            if op == "read":
+                answer["value"] = self.read(request["driver"],
+                                            request["command"],
+                                            request.get("node"))
+            elif op == "write":
+                self.write(request["driver"], request["command"],
+                           request.get("value"), request.get("node"))
+            else:
+                raise drv.DriverError("Unknown operation %r." % op)
+        except drv.HardwareError as e:
+            answer.update(error=str(e), type="HardwareError")
+        except Exception as e:
+            answer.update(error=str(e), type="DriverError")
+        return answer
+
+
+class _Handler(SocketServer.StreamRequestHandler):
+
+    def handle(self):
+        for line in iter(self.rfile.readline, ""):
+            try:
+                request = json.loads(line)
+            except ValueError:
+                answer = dict(id=None, error="Invalid request %r." % line,
+                              type="DriverError")
+            else:
+                answer = self.server.handle(request)
+            self.wfile.write(json.dumps(answer, default=str) + "\n")
+            self.wfile.flush()
+
+
+class ClientProtocol(drv.CommunicationProtocol):
+
+    """Forward the requests to an `InstrumentServer`.
+
+    The answers carry the id of their request so that the late answers
+    to the requests that timed out are dropped.
+
+    Parameters:
+        socket (tcp.TcpSocket): The socket to the server.
+        driver (str): The name of the driver on the server.
+        names (dict): Map the `Commands` to their name on the server,
+            see `commandNames()`.
+
+    """
+    def __init__(self, socket, driver, names, parent=None):
+        super(ClientProtocol, self).__init__(socket, parent)
+        self._driver = driver
+        self._id = 0
+        self._names = names
+        self._socket.newline = "\n"
+
+    def _name(self, context):
+        try:
+            return self._names[context._command]
+        except KeyError:
+            raise drv.DriverError("%r has no name on the server."
+                                  % context._command)
+
+    def _request(self, op, context, **kwargs):
+        self._id += 1
+        request = dict(id=self._id, op=op, driver=self._driver,
+                       command=self._name(context), node=context.node)
+        request.update(kwargs)
+        self._socket.write(json.dumps(request) + "\n")
+        while True:
+            line = self._socket.readline()
+            if not line.endswith("\n"):
+                raise drv.HardwareError("No answer from the server.")
+            try:
+                answer = json.loads(line)
+            except ValueError:
+                continue  # end of a line cut by a timeout
+            if answer.get("id") == self._id:
+                break
+            # Late answer to a request that timed out.
+        if "error" in answer:
+            raise (drv.HardwareError if answer["type"] == "HardwareError"
+                   else drv.DriverError)(answer["error"])
+        return answer.get("value")
+
+    def read(self, context):
+        return self._request("read", context)
+
+    def write(self, context):
+        self._request("write", context, value=context.value)
+
+
+def connectToServer(driver, socket, name):
+    """Forward the requests of `driver` to an `InstrumentServer`.
+
+    Every `CommunicationProtocol` on the route of a `Command` of
+    `driver`, including those set on private subsystems, is replaced
+    by a `ClientProtocol`; the other protocols, for example virtual
+    subsystems, are kept.  Call it before any request is sent.
+
+    Parameters:
+        driver (Subsystem): A driver of the same class as on the server.
+        socket (tcp.TcpSocket): The socket to the server.
+        name (str): The name of the driver on the server.
+
+    """
+    names = commandNames(driver)
+    client = ClientProtocol(socket, name, names)
+    for command in names:
+        try:
+            route = command._route()
+        except drv.DriverError:
+            continue  # neither parent nor protocol
+        if (isinstance(route.protocol, drv.CommunicationProtocol) and
+                not isinstance(route.protocol, ClientProtocol)):
+            # The protocol is set on the last subsystem of the route.
+            route.path[-1].setProtocol(client)
+    return driver
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve the instruments to pyhard2 clients.")
+    parser.add_argument("-a", "--address", default="127.0.0.1:7000",
+                        help="host:port to listen to (default: %(default)s)")
+    parser.add_argument("instruments", nargs="+", metavar="PORT=MODULE:CLASS",
+                        help="serial port and driver class")
+    args = parser.parse_args(argv)
+    drivers = {}
+    for instrument in args.instruments:
+        port, __, path = instrument.partition("=")
+        module, __, cls = path.partition(":")
+        drivers[port] = getattr(import_module(module), cls)(drv.Serial(port))
+    host, __, port = args.address.rpartition(":")
+    server = InstrumentServer(drivers, (host, int(port)))
+    logging.getLogger(__name__).info("Serving %s on %s:%i",
+                                     ", ".join(sorted(drivers)),
+                                     *server.server_address)
+    server.serve_forever()
+
+
+class TestInstrumentServer(unittest.TestCase):
+
+    def setUp(self):
+        from pyhard2.driver.pfeiffer import Maxigauge
+        self.Maxigauge = Maxigauge
+        socket = drv.TesterSocket()
+        socket.msg = {"PR1\r\n": "\x06\r\n0,1.234E-2\r\n",
+                      "UNI\r\n": "\x06\r\n0\r\n",
+                      "UNI 1\r\n": "\x06\r\n",
+                      "PR9\r\n": "\x15\r\n",
+                      "\x05\r\n": ""}
+        from pyhard2.driver.ieee.scpi import ScpiPowerSupply
+        self.ScpiPowerSupply = ScpiPowerSupply
+        psu = drv.TesterSocket()
+        psu.msg = {"SOUR:VOLT 1.5\n": "",
+                   "SOUR:VOLT?\n": "1.5\n",
+                   "SOUR:CURR?\n": "0.5\n",
+                   "SYST:VERS?\n": "1999.0\n"}
+        self.written = []
+        write = psu.write
+        psu.write = lambda msg: (self.written.append(msg), write(msg))[1]
+        self.server = InstrumentServer(dict(COM4=Maxigauge(socket),
+                                            COM5=ScpiPowerSupply(psu)))
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        client = tcp.connect("127.0.0.1", self.server.server_address[1])
+        self.client = connectToServer(Maxigauge(client), client, "COM4")
+
+    def tearDown(self):
+        tcp.closeAll()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _psu(self):
+        socket = tcp.connect("127.0.0.1", self.server.server_address[1])
+        return connectToServer(self.ScpiPowerSupply(socket), socket, "COM5")
+
+    def test_command_name(self):
+        self.assertEqual(commandName(self.client, self.client.gauge.pressure),
+                         "gauge.pressure")
+        psu = self._psu()
+        self.assertEqual(commandName(psu, psu.source.voltage),
+                         "source.voltage")
+        self.assertRaises(drv.DriverError, commandName, psu,
+                          self.client.gauge.pressure)
+
+    def test_command_names_private_parent(self):
+        from pyhard2.driver.keithley import Model6487
+        i = Model6487(drv.TesterSocket())
+        names = commandNames(i)
+        self.assertEqual(names[i.abort], "abort")
+        self.assertEqual(names[i.system.version], "system.version")
+        for command, name in names.iteritems():
+            self.assertIs(findCommand(i, name), command)
+
+    def test_read(self):
+        self.assertEqual(self.client.gauge.pressure.read(node=1), 0.01234)
+        self.assertEqual(self.client.unit.read(), "mbar")
+
+    def test_write(self):
+        self._psu().source.voltage.write(1.5)
+        self.assertEqual(self.written, ["SOUR:VOLT 1.5\n"])
+
+    def test_private_protocol(self):
+        psu = self._psu()
+        self.assertIsInstance(psu._scpi.protocol(), ClientProtocol)
+        self.assertEqual(psu.source.voltage.read(), 1.5)
+        self.assertEqual(psu.system.version.read(), 1999.0)
+
+    def test_late_answer_dropped(self):
+        psu = self._psu()
+        tcp.connect("127.0.0.1", self.server.server_address[1]).timeout = 0.25
+        command = self.server.command("COM5", "source.voltage")
+        readRaw = command._readRaw
+
+        def slowRead(node=None):
+            time.sleep(0.3)
+            return readRaw(node)
+
+        command._readRaw = slowRead
+        self.assertRaises(drv.HardwareError, psu.source.voltage.read)
+        self.assertEqual(psu.source.current.read(), 0.5)
+
+    def test_private_attribute(self):
+        answer = self.server.handle(dict(id=1, op="read", driver="COM4",
+                                         command="_protocol"))
+        self.assertEqual(answer["type"], "DriverError")
+
+    def test_hardware_error(self):
+        self.assertRaises(drv.HardwareError,
+                          self.client.gauge.pressure.read, 9)
+
+    def test_merge_reads(self):
+        command = self.server.command("COM4", "gauge.pressure")
+        started, release = threading.Event(), threading.Event()
+        readRaw = command._readRaw
+
+        def slowRead(node=None):
+            started.set()
+            release.wait()
+            return readRaw(node)
+
+        command._readRaw = slowRead
+        results = []
+        first = threading.Thread(target=lambda: results.append(
+            self.server.read("COM4", "gauge.pressure", 1)))
+        first.start()
+        started.wait()
+        second = threading.Thread(target=lambda: results.append(
+            self.server.read("COM4", "gauge.pressure", 1)))
+        second.start()
+        while not self.server._pending[
+                "COM4", "gauge.pressure", "1"].waiters:
+            time.sleep(0.001)
+        release.set()
+        first.join()
+        second.join()
+        self.assertEqual(results, ["0,1.234E-2"] * 2)
+        self.assertEqual(command.stats()[1].requests, 1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
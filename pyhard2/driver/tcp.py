@@ -0,0 +1,340 @@
+"""TCP transport for instruments on the network.
+
+`TcpSocket` implements the interface of :class:`pyhard2.driver.Serial`
+over a TCP connection, for example to raw SCPI on port 5025 of LXI
+instruments or to serial-to-Ethernet converters.  The connection is
+kept open between the requests and opened again when it drops.
+
+`connect()` returns the `TcpSocket` from a pool keyed by `host:port`
+so that every driver on the same instrument shares one connection::
+
+    i = ScpiPowerSupply(tcp.connect("192.168.0.10:5025"))
+
+"""
+import unittest
+import errno
+import select
+import socket as _socket
+import threading
+import time
+import pyhard2.driver as drv
+
+
+class TcpError(drv.DriverError):
+
+    """The connection to the instrument failed."""
+
+
+class TcpSocket(object):
+
+    """Socket to an instrument over TCP.
+
+    Parameters:
+        host (str): The host name or address.
+        port (int): The TCP port, default to 5025 (raw SCPI).
+        newline: The end-of-line marker used by `readline()`.
+        timeout (float): Timeout in seconds for connecting and reading.
+            With 0, the reads return the bytes received without waiting
+            and connecting blocks.
+        retries (int): Number of times to connect again when the
+            connection drops during `write()`.
+
+    """
+    def __init__(self, host, port=5025, newline="\n", timeout=5.0,
+                 retries=1):
+        self.host, self.port = host, port
+        self.newline = newline
+        self.retries = retries
+        self._timeout = timeout
+        self._socket = None
+        self._rbuffer = bytearray()
+
+    def __repr__(self):
+        return "%s(%r, %r)" % (self.__class__.__name__, self.host, self.port)
+
+    @property
+    def timeout(self):
+        """Timeout in seconds, None blocks."""
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, timeout):
+        self._timeout = timeout
+        if self._socket is not None:
+            self._socket.settimeout(timeout)
+
+    def isOpen(self):
+        """Return True if the connection is open."""
+        return self._socket is not None
+
+    def open(self):
+        """Open the connection if it is closed.
+
+        Raises:
+            TcpError: if the instrument cannot be reached.
+
+        """
+        if self._socket is not None:
+            return
+        try:
+            # A non-blocking connect would fail in progress.
+            self._socket = _socket.create_connection((self.host, self.port),
+                                                     self._timeout or None)
+        except _socket.error as e:
+            raise TcpError("Cannot connect to %s:%s: %s" % (
+                self.host, self.port, e))
+        self._socket.setsockopt(_socket.IPPROTO_TCP, _socket.TCP_NODELAY, 1)
+        self._socket.settimeout(self._timeout)
+
+    def close(self):
+        """Close the connection and drop the buffered input."""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        del self._rbuffer[:]
+
+    def _fill(self):
+        """Append the bytes received to the buffer.
+
+        Block until at least one byte arrives or `timeout` expires.
+
+        Returns:
+            int: The number of bytes read.
+
+        """
+        self.open()
+        try:
+            chunk = self._socket.recv(4096)
+        except _socket.timeout:
+            return 0
+        except _socket.error as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return 0  # nothing received with timeout=0
+            chunk = ""
+        if not chunk:
+            # The peer closed the connection; open it again on the next
+            # request.
+            self.close()
+            return 0
+        self._rbuffer.extend(chunk)
+        return len(chunk)
+
+    def write(self, data):
+        """Send `data`, connecting again if the connection dropped."""
+        drv.socketStats(self).recordWrite(len(data))
+        self.inWaiting()  # detect the connections closed by the peer
+        for attempt in range(self.retries + 1):
+            self.open()
+            try:
+                self._socket.sendall(data)
+                return
+            except _socket.error as e:
+                self.close()
+        raise TcpError("Cannot write to %s:%s: %s" % (
+            self.host, self.port, e))
+
+    def inWaiting(self):
+        """Return the number of bytes received and not read yet."""
+        if self._socket is not None:
+            while select.select([self._socket], [], [], 0)[0]:
+                if not self._fill():
+                    break
+        return len(self._rbuffer)
+
+    def flushInput(self):
+        """Drop the bytes received and not read yet."""
+        self.inWaiting()
+        del self._rbuffer[:]
+
+    def read(self, size=1):
+        """Read `size` bytes."""
+        start = time.time()
+        while len(self._rbuffer) < size:
+            if (not self._fill() or self._timeout is not None and
+                    time.time() - start > self._timeout):
+                break
+        data = bytes(self._rbuffer[:size])
+        del self._rbuffer[:size]
+        drv.socketStats(self).recordRead(
+            len(data), timeout=bool(self._timeout) and len(data) < size)
+        return data
+
+    def readinto(self, b):
+        """Read up to `len(b)` bytes into the writable buffer `b`.
+
+        Returns:
+            int: The number of bytes read.
+
+        """
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def readline(self):
+        """Return one line ending with `newline`.
+
+        The line is incomplete if the `timeout` expires.
+
+        """
+        start = time.time()
+        index = 0
+        while True:
+            end = self._rbuffer.find(self.newline, index)
+            if end != -1:
+                end += len(self.newline)
+                break
+            index = max(0, len(self._rbuffer) - len(self.newline) + 1)
+            if (not self._fill() or self._timeout is not None and
+                    time.time() - start > self._timeout):
+                end = len(self._rbuffer)
+                break
+        line = bytes(self._rbuffer[:end])
+        del self._rbuffer[:end]
+        drv.socketStats(self).recordRead(
+            len(line), timeout=not line.endswith(self.newline))
+        return line
+
+
+_pool = {}
+_poolLock = threading.Lock()
+
+
+def connect(host, port=5025, **kwargs):
+    """Return the `TcpSocket` to `host` and `port` from the pool.
+
+    Parameters:
+        host (str): The host name or address, or "host:port".
+        port (int): The TCP port if not given in `host`.
+        kwargs: Passed to `TcpSocket` when the socket is created.
+
+    """
+    if ":" in host:
+        host, port = host.rsplit(":", 1)
+    key = (host, int(port))
+    with _poolLock:
+        try:
+            return _pool[key]
+        except KeyError:
+            socket = _pool[key] = TcpSocket(*key, **kwargs)
+            return socket
+
+
+def closeAll():
+    """Close the connections in the pool and empty it."""
+    with _poolLock:
+        for socket in _pool.itervalues():
+            socket.close()
+        _pool.clear()
+
+
+class _LoopbackInstrument(object):
+
+    """TCP server answering canned messages on the loopback interface."""
+
+    def __init__(self, msg):
+        self.msg = msg
+        self.connections = 0
+        self._server = _socket.socket()
+        self._server.setsockopt(_socket.SOL_SOCKET, _socket.SO_REUSEADDR, 1)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen(1)
+        self.port = self._server.getsockname()[1]
+        self.dropNext = False
+        thread = threading.Thread(target=self._serve)
+        thread.daemon = True
+        thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, __ = self._server.accept()
+            except _socket.error:
+                return
+            self.connections += 1
+            buffer = ""
+            while True:
+                chunk = connection.recv(4096)
+                if not chunk:
+                    break
+                buffer += chunk
+                while "\n" in buffer:
+                    line, buffer = buffer.split("\n", 1)
+                    if self.dropNext:
+                        self.dropNext = False
+                        break
+                    connection.sendall(self.msg[line + "\n"])
+                else:
+                    continue
+                break
+            connection.close()
+
+    def close(self):
+        self._server.close()
+
+
+class TestTcpSocket(unittest.TestCase):
+
+    def setUp(self):
+        self.instrument = _LoopbackInstrument({
+            "SOUR:VOLT?\n": "1.7\n",
+            "SOUR:CURR?\n": "0.5\n",
+            "SOUR:VOLT?;:SOUR:CURR?\n": "1.7;0.5\n",
+            "DATA?\n": "1;2\n3\n"})
+        self.address = "127.0.0.1:%i" % self.instrument.port
+
+    def tearDown(self):
+        closeAll()
+        self.instrument.close()
+
+    def test_pool(self):
+        self.assertIs(connect(self.address),
+                      connect("127.0.0.1", self.instrument.port))
+
+    def test_scpi(self):
+        from pyhard2.driver.ieee.scpi import ScpiPowerSupply
+        i = ScpiPowerSupply(connect(self.address))
+        self.assertEqual(i.source.voltage.read(), 1.7)
+        self.assertEqual(i.readMany([(i.source.voltage, None),
+                                     (i.source.current, None)]),
+                         [1.7, 0.5])
+        self.assertEqual(self.instrument.connections, 1)
+
+    def test_read(self):
+        socket = connect(self.address)
+        socket.write("DATA?\n")
+        self.assertEqual(socket.read(2), "1;")
+        self.assertEqual(socket.readline(), "2\n")
+        self.assertEqual(socket.readline(), "3\n")
+
+    def test_reconnect(self):
+        socket = connect(self.address, timeout=1.0)
+        self.instrument.dropNext = True
+        socket.write("SOUR:VOLT?\n")
+        self.assertEqual(socket.readline(), "")
+        socket.write("SOUR:VOLT?\n")
+        self.assertEqual(socket.readline(), "1.7\n")
+        self.assertEqual(self.instrument.connections, 2)
+
+    def test_no_timeout(self):
+        socket = connect(self.address, timeout=0)
+        self.assertEqual(socket.read(2), "")
+        self.assertEqual(socket.readline(), "")
+        self.assertTrue(socket.isOpen())
+        socket.write("SOUR:VOLT?\n")
+        start = time.time()
+        while time.time() - start < 5.0 and not socket.inWaiting():
+            time.sleep(0.001)
+        self.assertEqual(socket.readline(), "1.7\n")
+        self.assertEqual(self.instrument.connections, 1)
+
+    def test_connection_refused(self):
+        closed = _socket.socket()
+        closed.bind(("127.0.0.1", 0))
+        port = closed.getsockname()[1]
+        closed.close()
+        socket = TcpSocket("127.0.0.1", port, timeout=1.0)
+        self.assertRaises(TcpError, socket.write, "SOUR:VOLT?\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,353 @@
+"""Tests of the driver core in :mod:`pyhard2.driver`.
+
+The core documents its behavior with doctests.  The tests needing
+threads, event loops, or stubbed ports are kept here so that importing
+the core does not load `unittest`.
+
+"""
+import unittest
+import threading
+import time
+from collections import deque
+import serial
+import pyhard2.driver as drv
+
+
+class _Protocol(drv.CommunicationProtocol):
+
+    """Record the nodes read and call `hook` with the context."""
+
+    def __init__(self, socket, log, hook=None):
+        super(_Protocol, self).__init__(socket)
+        self.log = log
+        self.hook = hook
+
+    def read(self, context):
+        if self.hook:
+            self.hook(context)
+        self.log.append((self._socket, context.node))
+        return context.node
+
+    def write(self, context):
+        self.log.append((self._socket, context.value))
+
+
+def _driver(protocol):
+    driver = drv.Subsystem()
+    driver.setProtocol(protocol)
+    driver.value = drv.Command("value")
+    return driver
+
+
+class _Port(serial.Serial):
+
+    """Port stub serving `chunks`, one chunk per read from the port."""
+
+    def __init__(self, *args, **kwargs):
+        super(_Port, self).__init__(*args, **kwargs)
+        self.chunks = deque()
+        self.reads = 0
+
+    def read(self, size=1):
+        self.reads += 1
+        if not self.chunks:
+            return ""  # timeout
+        chunk = self.chunks.popleft()
+        if len(chunk) > size:
+            self.chunks.appendleft(chunk[size:])
+        return chunk[:size]
+
+    def inWaiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def flushInput(self):
+        self.chunks.clear()
+
+
+class _Serial(drv.Serial, _Port):
+
+    """`Serial` reading from the `_Port` stub."""
+
+
+class TestSerial(unittest.TestCase):
+
+    def setUp(self):
+        self.serial = _Serial(newline="\r\n", timeout=0.05)
+
+    def test_split_lines(self):
+        self.serial.chunks.append("ab\r\ncd\r\nef")
+        self.assertEqual(self.serial.readline(), "ab\r\n")
+        self.assertEqual(self.serial.readline(), "cd\r\n")
+        self.assertEqual(self.serial.reads, 1)
+
+    def test_newline_across_fills(self):
+        self.serial.chunks.extend(["ab\r", "\ncd\r\n"])
+        self.assertEqual(self.serial.readline(), "ab\r\n")
+        self.assertEqual(self.serial.readline(), "cd\r\n")
+
+    def test_partial_line_on_timeout(self):
+        self.serial.chunks.append("ab")
+        self.assertEqual(self.serial.readline(), "ab")
+        self.assertEqual(drv.socketStats(self.serial).timeouts, 1)
+        self.assertEqual(self.serial.inWaiting(), 0)
+
+    def test_no_spin_without_timeout(self):
+        self.serial.timeout = 0
+        self.assertEqual(self.serial.readline(), "")
+        self.assertEqual(self.serial.reads, 1)
+
+    def test_readinto_memoryview(self):
+        self.serial.chunks.append("abcdef\r\n")
+        b = bytearray(4)
+        self.assertEqual(self.serial.readinto(memoryview(b)), 4)
+        self.assertEqual(b, "abcd")
+        self.assertEqual(self.serial.readline(), "ef\r\n")
+
+    def test_buffered_then_empty_newline(self):
+        self.serial.chunks.append("ab\r\ncd\nef")
+        self.assertEqual(self.serial.readline(), "ab\r\n")
+        self.serial.newline = ""
+        self.assertEqual(self.serial.readline(), "cd\n")
+
+    def test_flush_input(self):
+        self.serial.chunks.extend(["ab\r\ncd", "ef"])
+        self.serial.readline()
+        self.serial.flushInput()
+        self.assertEqual(self.serial.inWaiting(), 0)
+        self.assertEqual(self.serial.read(2), "")
+
+
+class TestTransactionLock(unittest.TestCase):
+
+    def test_exchanges_not_interleaved(self):
+        socket, log = drv.TesterSocket(), []
+
+        def exchange(name):
+            for __ in range(20):
+                with drv.transaction(socket):
+                    log.append((name, "request"))
+                    time.sleep(0.0005)
+                    log.append((name, "answer"))
+
+        threads = [threading.Thread(target=exchange, args=(name,))
+                   for name in "ab"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(log), 80)
+        for request, answer in zip(log[::2], log[1::2]):
+            self.assertEqual((request[1], answer[1]), ("request", "answer"))
+            self.assertEqual(request[0], answer[0])
+
+    def test_fifo(self):
+        lock, order = drv.TransactionLock(), []
+
+        def acquire(index):
+            with lock:
+                order.append(index)
+
+        threads = []
+        with lock:
+            for index in range(5):
+                thread = threading.Thread(target=acquire, args=(index,))
+                thread.start()
+                threads.append(thread)
+                while len(lock._waiting) <= index:
+                    time.sleep(0.001)  # queued in order
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, range(5))
+
+
+class _SlowProtocol(drv.CommunicationProtocol):
+
+    """Return the timeout of the socket after `delay` seconds, or the
+    empty line that timed out if `delay` is None."""
+
+    delay = 0.0
+
+    def read(self, context):
+        if self.delay is None:
+            return self._socket.readline()
+        time.sleep(self.delay)
+        return self._socket.timeout
+
+
+class TestStats(unittest.TestCase):
+
+    def setUp(self):
+        self.socket = drv.TesterSocket()
+        self.socket.timeout = 5.0
+        self.protocol = _SlowProtocol(self.socket)
+        self.driver = drv.Subsystem()
+        self.driver.setProtocol(self.protocol)
+        self.driver.first = drv.Command("first")
+        self.driver.second = drv.Command("second")
+        self.requests = [(self.driver.first, None), (self.driver.second, None)]
+
+    def test_batch_adaptive_timeout(self):
+        self.protocol.setAdaptiveTimeout(
+            drv.AdaptiveTimeout(floor=0.01, samples=1))
+        self.assertEqual(drv.readMany(self.requests), [5.0, 5.0])
+        self.assertEqual(drv.readMany(self.requests), [0.01, 0.01])
+        self.assertEqual(self.socket.timeout, 5.0)
+
+    def test_batch_round_trip(self):
+        self.protocol.delay = 0.01
+        drv.readMany(self.requests)
+        # Every request waited for both reads.
+        for command, node in self.requests:
+            self.assertGreaterEqual(command.stats()[node].percentile(100),
+                                    0.02)
+
+    def test_timeout_fails(self):
+        self.protocol.delay = None
+        self.assertEqual(self.driver.first.read(), "")
+        stats = self.driver.first.stats()[None]
+        self.assertEqual((stats.requests, stats.errors, stats.timeouts),
+                         (1, 1, 1))
+        self.assertEqual(stats.samples(), 0)
+
+    def test_exception_fails(self):
+        def fail(context):
+            raise drv.DriverError("Garbled answer.")
+
+        self.protocol.read = fail
+        self.assertRaises(drv.DriverError, self.driver.first.read)
+        stats = self.driver.first.stats()[None]
+        self.assertEqual((stats.errors, stats.consecutiveErrors), (1, 1))
+        self.assertEqual(self.protocol.stats().errors, 1)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        socket = drv.TesterSocket()
+        socket.timeout = 1.0
+        self.protocol = _SlowProtocol(socket)
+        self.driver = drv.Subsystem()
+        self.driver.setProtocol(self.protocol)
+        self.requests = []
+        for name in ("first", "second", "third"):
+            setattr(self.driver, name, drv.Command(name))
+            self.requests.append((getattr(self.driver, name), 1))
+        self.breaker = drv.circuitBreaker(self.driver.first, 1)
+
+    def test_one_outcome_per_node(self):
+        def readMany(contexts):
+            # One dropped frame fails every request of the exchange.
+            error = drv.HardwareError("Dropped frame.")
+            return [error] * len(contexts)
+
+        self.protocol.readMany = readMany
+        drv.readMany(self.requests, breaker=True)
+        self.assertEqual(self.breaker.state(), self.breaker.CLOSED)
+        for __ in range(2):
+            drv.readMany(self.requests, breaker=True)
+        self.assertEqual(self.breaker.state(), self.breaker.OPEN)
+        self.assertTrue(all(isinstance(value, drv.CircuitOpenError)
+                            for value in drv.readMany(self.requests,
+                                                      breaker=True)))
+
+    def test_driver_error_fails(self):
+        def readMany(contexts):
+            raise drv.DriverError("Expected XON/XOFF got '' instead.")
+
+        self.protocol.readMany = readMany
+        for __ in range(3):
+            self.assertRaises(drv.DriverError, drv.readMany, self.requests,
+                              breaker=True)
+        self.assertEqual(self.breaker.state(), self.breaker.OPEN)
+        self.assertEqual(self.breaker.failures, 3)
+
+    def test_probe_raises(self):
+        for __ in range(3):
+            self.breaker.record(False)
+        self.breaker._retryAt = time.time() - 1.0  # half open
+
+        def readMany(contexts):
+            raise drv.DriverError("Garbled answer.")
+
+        self.protocol.readMany = readMany
+        self.assertRaises(drv.DriverError, drv.readMany, self.requests,
+                          breaker=True)
+        self.assertFalse(self.breaker._probing)
+        self.breaker._retryAt = time.time() - 1.0
+        del self.protocol.readMany  # the node recovered
+        self.assertEqual(drv.readMany(self.requests, breaker=True),
+                         [1.0, 1.0, 1.0])
+        self.assertEqual(self.breaker.state(), self.breaker.CLOSED)
+
+    def test_probe_not_sent(self):
+        for __ in range(3):
+            self.breaker.record(False)
+        self.breaker._retryAt = time.time() - 1.0
+        self.driver.written = drv.Command("written", access=drv.Access.WO)
+        self.assertRaises(drv.DriverError, drv.readMany,
+                          self.requests + [(self.driver.written, 1)],
+                          breaker=True)
+        self.assertTrue(self.breaker.allow())
+
+    def test_any_success_closes(self):
+        def readMany(contexts):
+            return [drv.HardwareError("No answer.")] + [
+                context.reader for context in contexts[1:]]
+
+        self.protocol.readMany = readMany
+        for __ in range(3):
+            drv.readMany(self.requests, breaker=True)
+        self.assertEqual(self.breaker.state(), self.breaker.CLOSED)
+
+
+@unittest.skipIf(drv._futures() is None, "requires futures")
+class TestAsync(unittest.TestCase):
+
+    def setUp(self):
+        self.log = []
+        self.first, self.second = drv.TesterSocket(), drv.TesterSocket()
+
+    def test_aread_awrite(self):
+        driver = _driver(_Protocol(self.first, self.log))
+        self.assertEqual(driver.value.aread(node=2).result(timeout=5), 2)
+        self.assertIsNone(driver.value.awrite(3).result(timeout=5))
+        self.assertEqual(self.log, [(self.first, 2), (self.first, 3)])
+
+    def test_sockets_concurrent(self):
+        secondStarted = threading.Event()
+        first = _driver(_Protocol(
+            self.first, self.log,
+            lambda context: self.assertTrue(secondStarted.wait(5))))
+        second = _driver(_Protocol(
+            self.second, self.log, lambda context: secondStarted.set()))
+        # The first request blocks its socket until the second socket
+        # is read, which requires the sockets to run concurrently.
+        blocked = first.value.aread(node=0)
+        second.value.aread(node=0).result(timeout=5)
+        self.assertEqual(blocked.result(timeout=5), 0)
+
+    def test_socket_order(self):
+        driver = _driver(_Protocol(self.first, self.log))
+        futures = [driver.value.aread(node=node) for node in range(10)]
+        self.assertEqual([future.result(timeout=5) for future in futures],
+                         range(10))
+        self.assertEqual(self.log, [(self.first, node)
+                                    for node in range(10)])
+
+    @unittest.skipIf(drv._asyncio() is None,
+                     "requires asyncio or trollius")
+    def test_event_loop(self):
+        driver = _driver(_Protocol(self.first, self.log))
+        loop = drv._asyncio().new_event_loop()
+        try:
+            self.assertEqual(loop.run_until_complete(
+                driver.value.aread(node=4, loop=loop)), 4)
+            self.assertIsNone(loop.run_until_complete(
+                driver.value.awrite(5, loop=loop)))
+        finally:
+            loop.close()
+        self.assertEqual(self.log, [(self.first, 4), (self.first, 5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,10 +15,31 @@ class WatlowHardwareError(drv.HardwareError): pass
 class WatlowDriverError(drv.DriverError): pass
 
 
+class ErrorCheck(object):
+
+    """Enum for the error checking strategies of `XonXoffProtocol`.
+
+    An integer `N` queries the error register every `N` reads and when a
+    reply is malformed.
+
+    Attributes:
+        STRICT: Query the error register after every transaction.
+        LAZY: Query the error register after the writes and when a reply
+            is malformed.
+
+    """
+    STRICT, LAZY = [".".join(("ErrorCheck", a)) for a in "STRICT LAZY".split()]
+
+
 class XonXoffProtocol(drv.CommunicationProtocol):
 
     """Communication using the XON/XOFF protocol follows:
 
+    Parameters:
+        errorCheck (ErrorCheck.STRICT, ErrorCheck.LAZY, or int): When
+            to query the error register "ER2".  Errors do not change
+            the reply to a write so that the writes are always checked.
+
     .. uml::
 
         group Set
@@ -53,13 +74,25 @@ class XonXoffProtocol(drv.CommunicationProtocol):
             27: "Write only command",
             28: "Prompt not active"}
 
-    def __init__(self, socket):
+    def __init__(self, socket, errorCheck=ErrorCheck.STRICT):
         super(XonXoffProtocol, self).__init__(socket)
         self._socket.timeout = 5.0
         self._socket.newline = "\r"
-
-    def _xonxoff(self):
-        xonxoff = self._socket.read(2)
+        self.errorCheck = errorCheck
+        self._unchecked = 0
+
+    def _isCheckDue(self):
+        """Return True if the error register must be queried after a
+        well-formed reply; otherwise return False."""
+        if self.errorCheck == ErrorCheck.STRICT:
+            return True
+        self._unchecked += 1
+        return (self.errorCheck != ErrorCheck.LAZY and
+                self._unchecked >= self.errorCheck)
+
+    def _xonxoff(self, xonxoff=None):
+        if xonxoff is None:
+            xonxoff = self._socket.read(2)
         if not xonxoff == "\x13\x11":
             raise WatlowDriverError("Expected XON/XOFF (%r) got %r instead."
                                     % ("\x13\x11", xonxoff))
@@ -67,16 +100,26 @@ class XonXoffProtocol(drv.CommunicationProtocol):
     def read(self, context):
         line = "? {reader}\r".format(reader=context.reader)
         self._socket.write(line)
-        self._xonxoff()
+        xonxoff = self._socket.read(2)
+        try:
+            self._xonxoff(xonxoff)
+        except WatlowDriverError:
+            if xonxoff:
+                # The reply is malformed, the controller may tell why.
+                self._check_error(line)
+            raise
         ans = self._socket.readline()
-        self._check_error(line)     # check for error
+        checked = self._isCheckDue()
+        if checked:
+            self._check_error(line)     # check for error
         try:
             return float(ans.strip())  # unicode to number
         except ValueError:
             if ans.strip() == "-----":
                 raise WatlowHardwareError("Unplugged thermocouple.")
-            else:
-                raise
+            if not checked:
+                self._check_error(line)
+            raise
 
     def write(self, context):
         line = "= {writer} {value}\r".format(writer=context.writer,
@@ -86,6 +129,7 @@ class XonXoffProtocol(drv.CommunicationProtocol):
         self._check_error(line)     # check for error
 
     def _check_error(self, line):
+        self._unchecked = 0
         self._socket.write("? ER2\r")
         self._xonxoff()
         err_code = self._socket.readline()
@@ -131,9 +175,9 @@ class Series988(drv.Subsystem):
     .. graphviz:: gv/Series988.txt
 
     """
-    def __init__(self, socket):
+    def __init__(self, socket, errorCheck=ErrorCheck.STRICT):
         super(Series988, self).__init__()
-        self.setProtocol(XonXoffProtocol(socket))
+        self.setProtocol(XonXoffProtocol(socket, errorCheck))
         self.setpoint = Cmd("SP1", minimum=-250, maximum=9999)
         self.power = Cmd("PWR", access=Access.RO, doc="power output %")
         self.temperature1 = Cmd("C1", minimum=-250, maximum=9999,
@@ -198,8 +242,14 @@ class TestSeries988(unittest.TestCase):
                       "? ER2\r": "\x13\x110\r",
                       "? AMB\r": "\x13\x1172\r",
                       "= SP1 32\r": "\x13\x11",
-                      "= PB1A 12\r": "\x13\x11"
+                      "= PB1A 12\r": "\x13\x11",
+                      "? C1\r": "\x13\x11-----\r",
+                      "? C2\r": "\x13\x11???\r",
                      }
+        self.written = []
+        write = socket.write
+        socket.write = lambda msg: (self.written.append(msg), write(msg))[1]
+        self.socket = socket
         self.i = Series988(socket)
 
     def test_root_subsystem(self):
@@ -216,6 +266,55 @@ class TestSeries988(unittest.TestCase):
     def test_nested_write(self):
         self.i.operation.pid.a1.gain.write(12)
 
+    def test_strict_error_check(self):
+        self.i.setpoint.read()
+        self.assertEqual(self.written, ["? SP1\r", "? ER2\r"])
+
+    def test_no_error_check_without_reply(self):
+        self.socket.msg["? SP1\r"] = ""
+        self.assertRaises(WatlowDriverError, self.i.setpoint.read)
+        self.assertEqual(self.written, ["? SP1\r"])
+
+    def test_error_check_malformed_xonxoff(self):
+        self.socket.msg["? SP1\r"] = "\x11\x1325\r"
+        self.assertRaises(WatlowDriverError, self.i.setpoint.read)
+        self.assertEqual(self.written, ["? SP1\r", "? ER2\r"])
+
+    def test_lazy_error_check(self):
+        self.i.protocol().errorCheck = ErrorCheck.LAZY
+        for __ in range(3):
+            self.i.setpoint.read()
+        self.i.setpoint.write(32)
+        self.assertEqual(self.written.count("? ER2\r"), 1)
+
+    def test_lazy_error_check_malformed(self):
+        self.i.protocol().errorCheck = ErrorCheck.LAZY
+        self.assertRaises(ValueError, self.i.temperature2.read)
+        self.assertEqual(self.written, ["? C2\r", "? ER2\r"])
+        self.assertRaises(WatlowHardwareError, self.i.temperature1.read)
+
+    def test_timeouts_recorded(self):
+        policy = drv.AdaptiveTimeout(floor=0.01, samples=5)
+        self.i.protocol().setAdaptiveTimeout(policy)
+        for __ in range(5):
+            self.i.setpoint.read()
+        stats = self.i.setpoint.stats()[None]
+        self.assertEqual(policy.timeout(stats, 5.0), 0.01)
+        self.socket.msg["? SP1\r"] = ""  # no answer
+        for __ in range(3):
+            self.assertRaises(WatlowDriverError, self.i.setpoint.read)
+        self.assertNotIn("? ER2\r", self.written[-3:])
+        self.assertEqual((stats.requests, stats.errors,
+                          stats.consecutiveErrors), (8, 3, 3))
+        self.assertGreaterEqual(stats.timeouts, 3)
+        self.assertEqual(policy.timeout(stats, 5.0), 5.0)
+
+    def test_periodic_error_check(self):
+        self.i.protocol().errorCheck = 3
+        for __ in range(6):
+            self.i.setpoint.read()
+        self.assertEqual(self.written.count("? ER2\r"), 2)
+
 
 if __name__ == "__main__":
     import logging